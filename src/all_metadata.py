@@ -7,17 +7,22 @@ Code for AllMetadata.
 """
 import enum
 import logging
+import os
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from itertools import chain
+from functools import partial
 from pathlib import Path
-from typing import DefaultDict, Optional, Sequence
+from typing import DefaultDict, Sequence
 
 from src.book import Book, BookFile, SortDisplay
 from src.util import DirVars, Schema, SimpleEbookManagerExit, get_metadata_fn
 
 logger = logging.getLogger(__name__)
 
+# reading metadata is mostly waiting on file I/O, which releases the GIL
+_NUM_READ_THREADS = min(32, (os.cpu_count() or 1) * 4)
+
 
 class KeyType(enum.Enum):
     """Which type of key to assign in AllMetadata."""
@@ -35,18 +40,29 @@ def get_all_book_dirs(l_dirs: Sequence[Path]) -> Sequence[Path]:
     """
     all_b_dirs = []
     for l_dir in l_dirs:
-        if get_metadata_fn(l_dir).is_file():
+        if (l_dir_metadata_fn := get_metadata_fn(l_dir)).is_file():
             raise SimpleEbookManagerExit(
                 (
                     f"ERROR: specified library dir '{l_dir}' has a "
-                    f"'{get_metadata_fn(l_dir).name}' file and might be a book directory."
+                    f"'{l_dir_metadata_fn.name}' file and might be a book directory."
                 )
             )
 
+        # os.scandir gets file types while listing, so non-directories are skipped
+        # without any extra stat calls
+        with os.scandir(l_dir) as entries:
+            names = [
+                entry.name
+                for entry in entries
+                if not entry.name.startswith(".") and entry.is_dir()
+            ]
+        # sorting names with normcase matches Path ordering within one dir, without
+        # comparing Path parts
+        names.sort(key=os.path.normcase)
         all_b_dirs.extend(
             [
                 item
-                for item in sorted(l_dir.glob("[!.]*"))
+                for item in (l_dir / name for name in names)
                 if get_metadata_fn(item).is_file()
             ]
         )
@@ -61,38 +77,45 @@ def _get_books(
     b_dirs: Sequence[Path], dir_vars: DirVars, schema: Schema
 ) -> Sequence[Book]:
     """Get books from b_dirs and check for duplicates."""
-    titles = []
-    displays = []
-    sorts = []
+    titles: set[SortDisplay] = set()
+    displays: set[str] = set()
+    sorts: set[str] = set()
     books = []
-    for b_dir in b_dirs:
-        book = Book.from_args(b_dir, dir_vars, schema)
-        if book.title in titles:
-            if book.title.sort == book.title.display:
-                error_msg = f"ERROR: the title '{book.title.sort}' appears in more than one book."
-            else:
-                error_msg = (
-                    f"ERROR: the title with display '{book.title.display}' and sort "
-                    f"'{book.title.sort}' appears in more than one book."
+    # read books in parallel but check each one in b_dirs order as it arrives, so the
+    # first error in b_dirs order is raised whether it's a read error or a duplicate
+    with ThreadPoolExecutor(_NUM_READ_THREADS) as executor:
+        for book in executor.map(
+            partial(Book.from_args, dir_vars=dir_vars, schema=schema), b_dirs
+        ):
+            if book.title in titles:
+                if book.title.sort == book.title.display:
+                    error_msg = (
+                        f"ERROR: the title '{book.title.sort}' appears in more than one "
+                        "book."
+                    )
+                else:
+                    error_msg = (
+                        f"ERROR: the title with display '{book.title.display}' and sort "
+                        f"'{book.title.sort}' appears in more than one book."
+                    )
+                raise SimpleEbookManagerExit(error_msg)
+            titles.add(book.title)
+
+            if book.title.display in displays:
+                raise SimpleEbookManagerExit(
+                    f"ERROR: the title display value '{book.title.display}' has more than "
+                    "one sort value over all books."
                 )
-            raise SimpleEbookManagerExit(error_msg)
-        titles.append(book.title)
+            displays.add(book.title.display)
 
-        if book.title.display in displays:
-            raise SimpleEbookManagerExit(
-                f"ERROR: the title display value '{book.title.display}' has more than one sort "
-                "value over all books."
-            )
-        displays.append(book.title.display)
-
-        if book.title.sort in sorts:
-            raise SimpleEbookManagerExit(
-                f"ERROR: the title sort value '{book.title.sort}' has more than one display value "
-                "over all books."
-            )
-        sorts.append(book.title.sort)
+            if book.title.sort in sorts:
+                raise SimpleEbookManagerExit(
+                    f"ERROR: the title sort value '{book.title.sort}' has more than one "
+                    "display value over all books."
+                )
+            sorts.add(book.title.sort)
 
-        books.append(book)
+            books.append(book)
 
     return tuple(sorted(books))
 
@@ -106,39 +129,65 @@ def _sd_error_duplicate(fieldname: str, type_: str, val: str) -> None:
     )
 
 
-_SDDicts = dict[str, dict[SortDisplay, SortDisplay]]
+def _get_uuid_keys(num: int) -> Sequence[str]:
+    """Get num random UUID4 keys from a single os.urandom call."""
+    rand_bytes = os.urandom(16 * num)
+    return tuple(
+        str(uuid.UUID(bytes=rand_bytes[i : i + 16], version=4))
+        for i in range(0, len(rand_bytes), 16)
+    )
+
+
+AMFields = dict[str, Sequence[SortDisplay]]
 
 
-def _get_sd_dicts(books: Sequence[Book], key_type: KeyType) -> _SDDicts:
-    """Get SortDisplays from books, assign keys and check for duplicates."""
+def _get_sd_lists(books: Sequence[Book]) -> AMFields:
+    """Get sorted SortDisplays without keys from books and check for duplicates."""
     sd_sets: dict[str, set[SortDisplay]] = DefaultDict(set)
 
     for book in books:
         for fieldname, sds in book.fields.sortdisplays.items():
-            sd_sets[fieldname] |= set(sds)
+            sd_sets[fieldname].update(sds)
 
-    sd_dicts: _SDDicts = DefaultDict(dict)
+    sd_lists: AMFields = {}
     for fieldname, sd_set in sd_sets.items():
-        displays = sorted([sd.display for sd in sd_set])
-        for i in range(len(displays) - 1):
-            if displays[i] == displays[i + 1]:
-                _sd_error_duplicate(fieldname, "display", displays[i])
-
+        # check displays first and report the smallest duplicate display
+        displays: set[str] = set()
+        duplicate_displays: set[str] = set()
+        for sd in sd_set:
+            if sd.display in displays:
+                duplicate_displays.add(sd.display)
+            displays.add(sd.display)
+        if duplicate_displays:
+            _sd_error_duplicate(fieldname, "display", min(duplicate_displays))
+
+        # equal sorts are adjacent in sd_list
         sd_list = sorted(sd_set)
-        for i, sd in enumerate(sd_list):
-            if (i < (len(sd_list) - 1)) and (sd.sort == sd_list[i + 1].sort):
-                _sd_error_duplicate(fieldname, "sort", sd.sort)
+        for i in range(len(sd_list) - 1):
+            if sd_list[i].sort == sd_list[i + 1].sort:
+                _sd_error_duplicate(fieldname, "sort", sd_list[i].sort)
+
+        sd_lists[fieldname] = tuple(sd_list)
+
+    return sd_lists
+
+
+_SDDicts = dict[str, dict[SortDisplay, SortDisplay]]
 
-            key: Optional[str]
-            match key_type:
-                case KeyType.INT:
-                    key = str(i + 1)
-                case KeyType.NONE:
-                    key = None
-                case KeyType.UUID:
-                    key = str(uuid.uuid4())
 
-            sd_dicts[fieldname][sd] = SortDisplay(sd.sort, sd.display, key)
+def _get_sd_dicts(sd_lists: AMFields, key_type: KeyType) -> _SDDicts:
+    """Assign keys to SortDisplays."""
+    sd_dicts: _SDDicts = {}
+    for fieldname, sd_list in sd_lists.items():
+        uuid_keys = _get_uuid_keys(len(sd_list) if key_type == KeyType.UUID else 0)
+        sd_dicts[fieldname] = {
+            sd: SortDisplay(
+                sd.sort,
+                sd.display,
+                uuid_keys[i] if key_type == KeyType.UUID else str(i + 1),
+            )
+            for i, sd in enumerate(sd_list)
+        }
 
     return sd_dicts
 
@@ -147,12 +196,13 @@ def _get_books_with_keys(
     books_no_keys: Sequence[Book], sd_dicts: _SDDicts, key_type: KeyType
 ) -> Sequence[Book]:
     """Add keys to books."""
+    uuid_keys = _get_uuid_keys(len(books_no_keys) if key_type == KeyType.UUID else 0)
     books_with_keys = []
     for i, book in enumerate(books_no_keys):
         book.title = SortDisplay(
             sort=book.title.sort,
             display=book.title.display,
-            _key=str(uuid.uuid4()) if key_type == KeyType.UUID else str(i + 1),
+            _key=uuid_keys[i] if key_type == KeyType.UUID else str(i + 1),
         )
         for fieldname, sds_no_key in book.fields.sortdisplays.items():
             if sds_no_key is not None:
@@ -164,9 +214,6 @@ def _get_books_with_keys(
     return tuple(books_with_keys)
 
 
-AMFields = dict[str, Sequence[SortDisplay]]
-
-
 @dataclass(frozen=True)
 class AllMetadata:
     """All books and data extracted from books."""
@@ -194,14 +241,18 @@ class AllMetadata:
             )
 
         books_no_keys = _get_books(get_all_book_dirs(l_dirs), dir_vars, schema)
-        sd_dicts = _get_sd_dicts(books_no_keys, key_type)
+        sd_lists = _get_sd_lists(books_no_keys)
+        all_files: list[BookFile] = []
+        for book in books_no_keys:
+            all_files.extend(book.files)
+        files = tuple(sorted(all_files))
+
+        if key_type == KeyType.NONE:
+            return cls(books_no_keys, sd_lists, files)
 
+        sd_dicts = _get_sd_dicts(sd_lists, key_type)
         return cls(
-            (
-                _get_books_with_keys(books_no_keys, sd_dicts, key_type)
-                if key_type != KeyType.NONE
-                else books_no_keys
-            ),
+            _get_books_with_keys(books_no_keys, sd_dicts, key_type),
             {k: tuple(v.values()) for k, v in sd_dicts.items()},
-            tuple(sorted(chain.from_iterable([book.files for book in books_no_keys]))),
+            files,
         )
@@ -7,7 +7,7 @@ Code for Book.
 The Unicode/ASCII replacement logic is in the _replace_unicode function.
 
 """
-import json
+import os
 import re
 from dataclasses import dataclass
 from pathlib import Path
@@ -20,12 +20,12 @@ from src.util import (
     SchemaItemTypes,
     SimpleEbookManagerException,
     SimpleEbookManagerExit,
+    get_json_bytes,
     get_metadata_fn,
     get_string_fn,
+    get_text_bytes,
     read_metadata,
     read_text,
-    write_json,
-    write_text,
 )
 
 from .date import BookDate
@@ -34,98 +34,100 @@ from .keyvalue import BookKeyValue
 from .sortdisplay import SortDisplay
 
 
-class _BookJSONEncoder(json.JSONEncoder):
-    """Encoder to write a book's metadata JSON."""
-
-    def __init__(self, schema: Schema, **kwargs: Any) -> None:
-        super().__init__(**kwargs)
-        self._schema = schema
-
-    def default(self, o: Any) -> Any:
-        if isinstance(o, Book):
-            book = o
-            r_val: dict[str, Any] = {}
-            for item in self._schema:
-                match item:
-                    case SchemaItemTypes.Date():
-                        r_val[item.name] = (
-                            date_val.as_str(item.input_format)
-                            if (date_val := book.fields.dates[item.name]) is not None
-                            else None
-                        )
-
-                    case SchemaItemTypes.File():
-                        files_val = [
-                            {
-                                "directory": file.input_dir_str,
-                                "hash": file.hash,
-                                "name": file.basename,
-                            }
-                            for file in book.files
-                        ]
-                        r_val[item.name] = (
-                            files_val[0] if len(files_val) == 1 else files_val
-                        )
-
-                    case SchemaItemTypes.KeyValue():
-                        r_val[item.name] = (
-                            {i.key: i.value for i in kv_val}
-                            if (kv_val := book.fields.keyvalues[item.name])
-                            else None
-                        )
-
-                    case SchemaItemTypes.SortDisplay():
-                        sd_inputs = [
-                            sd.display
-                            if sd.display == sd.sort
-                            else {"display": sd.display, "sort": sd.sort}
-                            for sd in book.fields.sortdisplays[item.name]
-                        ]
-                        if len(sd_inputs) == 0:
-                            r_val[item.name] = None
-                        elif len(sd_inputs) == 1:
-                            r_val[item.name] = sd_inputs[0]
-                        else:
-                            r_val[item.name] = sd_inputs
-
-                    case SchemaItemTypes.String() if item.inline:
-                        r_val[item.name] = book.fields.strings[item.name]
-                    case SchemaItemTypes.Title():
-                        r_val[item.name] = (
-                            book.title.display
-                            if book.title.display == book.title.sort
-                            else {
-                                "display": book.title.display,
-                                "sort": book.title.sort,
-                            }
-                        )
-
-            return dict(sorted(r_val.items()))
-
-        return super().default(o)
+def _get_metadata_json(book: "Book", schema: Schema) -> dict[str, Any]:
+    """Get a book's metadata as JSON-serializable data.
+
+    Key order doesn't matter here since write_json sorts keys.
+
+    """
+    r_val: dict[str, Any] = {}
+    for item in schema:
+        match item:
+            case SchemaItemTypes.Date():
+                r_val[item.name] = (
+                    date_val.as_str(item.input_format)
+                    if (date_val := book.fields.dates[item.name]) is not None
+                    else None
+                )
+
+            case SchemaItemTypes.File():
+                files_val = [
+                    {
+                        "directory": file.input_dir_str,
+                        "hash": file.hash,
+                        "name": file.basename,
+                    }
+                    for file in book.files
+                ]
+                r_val[item.name] = files_val[0] if len(files_val) == 1 else files_val
+
+            case SchemaItemTypes.KeyValue():
+                r_val[item.name] = (
+                    {i.key: i.value for i in kv_val}
+                    if (kv_val := book.fields.keyvalues[item.name])
+                    else None
+                )
+
+            case SchemaItemTypes.SortDisplay():
+                sd_inputs = [
+                    sd.display
+                    if sd.display == sd.sort
+                    else {"display": sd.display, "sort": sd.sort}
+                    for sd in book.fields.sortdisplays[item.name]
+                ]
+                if len(sd_inputs) == 0:
+                    r_val[item.name] = None
+                elif len(sd_inputs) == 1:
+                    r_val[item.name] = sd_inputs[0]
+                else:
+                    r_val[item.name] = sd_inputs
+
+            case SchemaItemTypes.String() if item.inline:
+                r_val[item.name] = book.fields.strings[item.name]
+            case SchemaItemTypes.Title():
+                r_val[item.name] = (
+                    book.title.display
+                    if book.title.display == book.title.sort
+                    else {
+                        "display": book.title.display,
+                        "sort": book.title.sort,
+                    }
+                )
+
+    return r_val
+
+
+# whitespace other than newlines at the beginning or end of a line
+_LINE_WHITESPACE_RE = re.compile(r"^[^\S\n]+|[^\S\n]+$", re.MULTILINE)
 
 
 def _remove_whitespace(text: str) -> str:
     """Remove whitespace from beginning and end of lines."""
-    return "\n".join([line.strip() for line in text.split("\n")])
+    return _LINE_WHITESPACE_RE.sub("", text)
 
 
-def _replace_unicode(text: str) -> str:
-    """Replace specific Unicode symbols."""
-    return (
-        # em dash with whitespace
-        re.sub(r"(\w)—(\w)", r"\g<1> -- \g<2>", text)
-        .replace("“", '"')
-        .replace("”", '"')
-        .replace("‘", "'")
-        .replace("’", "'")
-        .replace("…", "...")
-        .replace("•", "*")
+# em dash with whitespace
+_EM_DASH_RE = re.compile(r"(\w)—(\w)")
+
+_UNICODE_TABLE = str.maketrans(
+    {
+        "“": '"',
+        "”": '"',
+        "‘": "'",
+        "’": "'",
+        "…": "...",
+        "•": "*",
         # en dash
-        .replace("–", "-")
+        "–": "-",
         # em dash
-        .replace("—", "--")
-    )
+        "—": "--",
+    }
+)
+
+
+def _replace_unicode(text: str) -> str:
+    """Replace specific Unicode symbols."""
+    return _EM_DASH_RE.sub(r"\g<1> -- \g<2>", text).translate(_UNICODE_TABLE)
 
 
 @dataclass(frozen=True)
@@ -154,7 +156,7 @@ def _get_files(
         f_inputs = [f_inputs]
 
     files: list[BookFile] = []
-    basenames: list[str] = []
+    basenames: set[str] = set()
     for f_dict in sorted(f_inputs, key=lambda fd: fd["name"]):
         match f_dict:
             case {"directory": input_dir_str, "name": basename, "hash": hash_}:
@@ -169,7 +171,7 @@ def _get_files(
                 f"ERROR: duplicate file with name '{basename}' found in "
                 f"'{get_metadata_fn(metadata_dir)}'."
             ) from None
-        basenames.append(basename)
+        basenames.add(basename)
 
         files.append(
             BookFile.from_args(
@@ -209,8 +211,8 @@ def _get_sortdisplays(
         sd_inputs = [sd_inputs]
 
     sds = []
-    sorts = []
-    displays = []
+    sorts: set[str] = set()
+    displays: set[str] = set()
     for sd_input in sd_inputs:
         match sd_input:
             case str(sort):
@@ -225,14 +227,14 @@ def _get_sortdisplays(
                 f"ERROR: duplicate '{d_type}' data 'sort={sd.sort}' found in "
                 f"'{get_metadata_fn(metadata_dir)}'."
             ) from None
-        sorts.append(sd.sort)
+        sorts.add(sd.sort)
 
         if sd.display in displays:
             raise SimpleEbookManagerExit(
                 f"ERROR: duplicate '{d_type}' data 'display={sd.display}' found in "
                 f"'{get_metadata_fn(metadata_dir)}'."
             ) from None
-        displays.append(sd.display)
+        displays.add(sd.display)
 
         sds.append(sd)
 
@@ -277,23 +279,20 @@ class Book:
         """Get prefix for non-inline string text files."""
         return _str_title_prefix(self.title.display)
 
-    def write_metadata(
+    def get_metadata_bytes(
         self,
         o_dir: Path,
         schema: Schema,
         *,
         newline: Newline = Newline.POSIX,
         replace_unicode: bool = False,
-    ) -> Sequence[Path]:
-        """Write metadata for this book and return written filenames."""
-        metadata_fn = get_metadata_fn(o_dir)
-        write_json(
-            get_metadata_fn(o_dir),
-            self,
-            newline=newline,
-            custom_kw={"cls": _BookJSONEncoder, "schema": schema},
-        )
-        output_fns = [metadata_fn]
+    ) -> dict[Path, bytes]:
+        """Get metadata file contents for this book keyed by filenames in o_dir."""
+        outputs = {
+            get_metadata_fn(o_dir): get_json_bytes(
+                _get_metadata_json(self, schema), newline=newline
+            )
+        }
 
         for item in schema:
             if (
@@ -304,15 +303,31 @@ class Book:
                 s_val = _remove_whitespace(s_val)
                 if replace_unicode:
                     s_val = _replace_unicode(s_val)
-                string_fn = get_string_fn(o_dir, item.name)
-                write_text(string_fn, self.str_title_prefix + s_val, newline=newline)
-                output_fns.append(string_fn)
-        return output_fns
+                outputs[get_string_fn(o_dir, item.name)] = get_text_bytes(
+                    self.str_title_prefix + s_val, newline=newline
+                )
+        return outputs
+
+    def write_metadata(
+        self,
+        o_dir: Path,
+        schema: Schema,
+        *,
+        newline: Newline = Newline.POSIX,
+        replace_unicode: bool = False,
+    ) -> Sequence[Path]:
+        """Write metadata for this book and return written filenames."""
+        outputs = self.get_metadata_bytes(
+            o_dir, schema, newline=newline, replace_unicode=replace_unicode
+        )
+        for fn, data in outputs.items():
+            fn.write_bytes(data)
+        return list(outputs)
 
     @classmethod
     def from_args(cls, b_dir: Path, dir_vars: DirVars, schema: Schema) -> "Book":
         """Get Book from args."""
-        metadata_dir = b_dir.resolve()
+        metadata_dir = Path(os.path.realpath(b_dir))
         dir_vars = tuple(sorted(dir_vars))
         metadata_fn = get_metadata_fn(metadata_dir)
         metadata = read_metadata(metadata_fn)
@@ -7,10 +7,35 @@ Code for BookDate.
 """
 from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
+from typing import Sequence
 
 _YEAR = "%Y"
 
 
+@lru_cache(maxsize=32)
+def _split_fmt(dt_fmt: str) -> Sequence[str]:
+    """Split dt_fmt on the year directive."""
+    return tuple(dt_fmt.split(_YEAR))
+
+
+def _format_datetime(dt: datetime, dt_fmt: str) -> str:
+    """Format dt with dt_fmt."""
+    if len(parts := _split_fmt(dt_fmt)) == 1:
+        return datetime.strftime(dt, dt_fmt)
+
+    # There's a Python issue with inconsistent formatting for years < 1000 on some
+    # platforms, see https://github.com/python/cpython/issues/57514.
+    year_formatted = datetime.strftime(dt, _YEAR).zfill(4)
+    return year_formatted.join([datetime.strftime(dt, part) for part in parts])
+
+
+# many books in a library share dates, for example publication years. Aware datetimes
+# for the same instant compare and hash equal but can format differently, so only naive
+# datetimes are cached.
+_format_naive_datetime = lru_cache(maxsize=4096)(_format_datetime)
+
+
 @dataclass(frozen=True)
 class BookDate:
     """Class for book date information."""
@@ -19,12 +44,9 @@ class BookDate:
 
     def as_str(self, dt_fmt: str) -> str:
         """Get a formatted date string."""
-        # There's a Python issue with inconsistent formatting for years < 1000 on some
-        # platforms, see https://github.com/python/cpython/issues/57514.
-        year_formatted = datetime.strftime(self._datetime, _YEAR).zfill(4)
-        return year_formatted.join(
-            [datetime.strftime(self._datetime, part) for part in dt_fmt.split(_YEAR)]
-        )
+        if self._datetime.tzinfo is None:
+            return _format_naive_datetime(self._datetime, dt_fmt)
+        return _format_datetime(self._datetime, dt_fmt)
 
     @classmethod
     def from_args(cls, dt_str: str, dt_fmt: str) -> "BookDate":
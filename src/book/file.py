@@ -5,10 +5,18 @@ Licensed under the GNU Affero General Public License (AGPL) v3.
 Code for BookFile.
 
 """
+import os
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 
-from src.util import DirVars, SimpleEbookManagerExit
+from src.util import DirVar, DirVars, SimpleEbookManagerExit
+
+
+@lru_cache(maxsize=8)
+def _get_dir_vars_map(dir_vars: tuple[DirVar, ...]) -> dict[str, str]:
+    """Get dir var values by name, cached since all files usually share dir_vars."""
+    return {dir_var.name: dir_var.value for dir_var in dir_vars}
 
 
 @dataclass(order=True)
@@ -35,10 +43,13 @@ class BookFile:
     ) -> "BookFile":
         """Get BookFile from args."""
         try:
-            # process input_dir_str through Path to localize it for the current platform
-            interpolated_dir = str(Path(input_dir_str)).format(
-                **dict({dir_var.name: dir_var.value for dir_var in dir_vars})
-            )
+            # process input_dir_str through Path to localize it for the current platform.
+            # This can be skipped when the separator is already "/" only because the
+            # Path(interpolated_dir) below normalizes again ("//", "." parts, trailing
+            # slashes, ""), so don't use interpolated_dir as a string.
+            interpolated_dir = (
+                input_dir_str if os.sep == "/" else str(Path(input_dir_str))
+            ).format_map(_get_dir_vars_map(tuple(dir_vars)))
         except KeyError:
             dir_vars_str = (
                 ", ".join([str(dir_var) for dir_var in dir_vars])
@@ -59,5 +70,5 @@ class BookFile:
             hash_,
             temp_fn
             if (temp_fn := Path(interpolated_dir) / basename).is_absolute()
-            else (metadata_dir / temp_fn).resolve(),
+            else Path(os.path.realpath(metadata_dir / temp_fn)),
         )
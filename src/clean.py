@@ -6,14 +6,10 @@ Code for clean command.
 
 """
 import logging
-import shutil
 from argparse import Namespace
 from pathlib import Path
-from tempfile import TemporaryDirectory
-from typing import Optional, Sequence
+from typing import TYPE_CHECKING, Optional
 
-from src.all_metadata import AllMetadata, KeyType
-from src.book import Book, BookFile
 from src.command import Args, CmdNames, Command
 from src.util import (
     Algorithm,
@@ -21,19 +17,22 @@ from src.util import (
     Schema,
     SimpleEbookManagerException,
     SimpleEbookManagerExit,
-    cmp,
     get_file_hashes,
     get_metadata_fn,
     get_newline,
     read_schema,
 )
 
+if TYPE_CHECKING:
+    from src.all_metadata import AllMetadata
+    from src.book import BookFile
+
 logger = logging.getLogger(__name__)
 
 _BATCH_SIZE = 100
 
 
-def _get_algo(algo_str: Optional[str], bookfile: BookFile) -> Optional[Algorithm]:
+def _get_algo(algo_str: Optional[str], bookfile: "BookFile") -> Optional[Algorithm]:
     """Get Algorithm.
 
     Return None if algo_str is None, else Algorithm from algo_str if it's not "autodetect", else
@@ -61,19 +60,21 @@ def _get_algo(algo_str: Optional[str], bookfile: BookFile) -> Optional[Algorithm
     raise SimpleEbookManagerException(f"invalid algo_str: '{algo_str}'")
 
 
-def _update_files_if_changed(book: Book, output_fns: Sequence[Path]) -> bool:
-    """Replace metadata files from t_dir if the files have changed."""
+def _update_files_if_changed(outputs: dict[Path, bytes]) -> bool:
+    """Write metadata files from outputs if the files have changed."""
     changes_found = False
-    for fn in output_fns:
-        if not cmp(fn, (orig_fn := book.metadata_dir / fn.name)):
+    for fn, data in outputs.items():
+        if not (
+            fn.is_file() and fn.stat().st_size == len(data) and fn.read_bytes() == data
+        ):
             changes_found = True
-            shutil.move(fn, orig_fn)
-            logger.info("'%s': file changed.", orig_fn)
+            fn.write_bytes(data)
+            logger.info("'%s': file changed.", fn)
     return changes_found
 
 
 def _clean(
-    am: AllMetadata,
+    am: "AllMetadata",
     schema: Schema,
     newline: Newline,
     algo: Optional[Algorithm],
@@ -82,12 +83,13 @@ def _clean(
     """Update metadata files for each book as appropriate."""
     if algo is not None:
         logger.info("Calculating file hashes.")
-        hashes = dict(get_file_hashes([f.fn for f in am.files], algo))
+        hashes = get_file_hashes([f.fn for f in am.files], algo)
         logger.info("Done calculating file hashes.")
 
     logger.info("Starting processing.")
 
     i = 0
+    next_log_i = _BATCH_SIZE
     changes_found = False
     for i, book in enumerate(am.books, start=1):
         if algo is not None:
@@ -105,15 +107,14 @@ def _clean(
                     )
                     file.hash = calc_hash
 
-        with TemporaryDirectory() as t_dir_str:
-            t_dir = Path(t_dir_str)
-            fns = book.write_metadata(
-                t_dir, schema, newline=newline, replace_unicode=replace_unicode
-            )
-            changes_found = _update_files_if_changed(book, fns) or changes_found
+        outputs = book.get_metadata_bytes(
+            book.metadata_dir, schema, newline=newline, replace_unicode=replace_unicode
+        )
+        changes_found = _update_files_if_changed(outputs) or changes_found
 
-        if not i % _BATCH_SIZE:
+        if i == next_log_i:
             logger.info("Processed %s book%s.", i, "" if i == 1 else "s")
+            next_log_i += _BATCH_SIZE
 
     if len(am.books) % _BATCH_SIZE:
         logger.info(
@@ -129,6 +130,9 @@ def _clean(
 
 def _main(args: Namespace, _: Optional[list[str]] = None) -> None:
     """Main code for executing command."""
+    # pylint: disable-next=import-outside-toplevel
+    from src.all_metadata import AllMetadata, KeyType
+
     schema = read_schema(fn=args.schema, dirs=args.library_dirs)
     am = AllMetadata.from_args(
         args.library_dirs, args.dir_vars, schema, key_type=KeyType.NONE
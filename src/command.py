@@ -5,6 +5,7 @@ Licensed under the GNU Affero General Public License (AGPL) v3.
 Command class and helpers.
 
 """
+import os
 from argparse import Action, ArgumentParser, Namespace
 from dataclasses import dataclass
 from pathlib import Path
@@ -60,6 +61,7 @@ class LibraryDirsAction(Action):
         """Append library dirs as Paths and check for duplicates."""
         items = getattr(args, self.dest, None)
         l_dirs = [] if items is None else list(items)
+        l_dirs_seen = set(l_dirs)
 
         # from the Action docstring: "values" is None or str only if nargs is "?",
         # which it should not be
@@ -67,17 +69,20 @@ class LibraryDirsAction(Action):
             raise SimpleEbookManagerException(f"problem with '{opt}' values")
 
         for val in vals:
-            if not (new_l_dir := Path(val)).is_dir():
+            # check the Path rather than val, since Path("") is "." and is a valid dir
+            new_l_dir = Path(val)
+            if not os.path.isdir(new_l_dir):
                 raise SimpleEbookManagerExit(
                     f"ERROR: library dir '{new_l_dir}' is not a directory.",
                 )
 
-            if new_l_dir in l_dirs:
+            if new_l_dir in l_dirs_seen:
                 raise SimpleEbookManagerExit(
                     f"ERROR: duplicate library dir found: '{new_l_dir}'."
                 )
 
             l_dirs.append(new_l_dir)
+            l_dirs_seen.add(new_l_dir)
 
         setattr(args, self.dest, tuple(l_dirs))
 
@@ -258,6 +263,9 @@ def run_cmd_main(sys_argv: Sequence[str], cmds_seq: Sequence[Command]) -> None:
 
     """
     cmds = {cmd.cmd_name: cmd for cmd in cmds_seq}
+    # only the requested command's arguments are needed. Without a valid command, argparse can
+    # only print the top-level help or an error, and neither shows command arguments.
+    cmd_requested = (len(sys_argv) > 1) and (sys_argv[1] in cmds)
 
     parser = ArgumentParser(prog=sys_argv[0])
     subparsers = parser.add_subparsers(title="commands", dest="command", required=True)
@@ -268,14 +276,11 @@ def run_cmd_main(sys_argv: Sequence[str], cmds_seq: Sequence[Command]) -> None:
             description=cmd.subparser_kwargs["description"],
             help=cmd.subparser_kwargs["help"],
         )
-        cmd.configure_subparser(subparser)
+        if cmd_requested and (cmd.cmd_name == sys_argv[1]):
+            cmd.configure_subparser(subparser)
         subparser.set_defaults(**{cmd_arg_name: cmd})
 
-    use_parse_known_args = (
-        (len(sys_argv) > 1)
-        and (sys_argv[1] in cmds)
-        and (cmds[sys_argv[1]].has_extra_args)
-    )
+    use_parse_known_args = cmd_requested and cmds[sys_argv[1]].has_extra_args
     known_args, extra_args = (
         parser.parse_known_args(sys_argv[1:])
         if use_parse_known_args
@@ -7,18 +7,32 @@ Create one or more CSV files for books.
 """
 import logging
 from argparse import Namespace
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
-from typing import Optional, Sequence
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Sequence
 
-from src.all_metadata import AllMetadata, KeyType
-from src.book import BookFile, SortDisplay
 from src.command import Args, CmdNames, Command
-from src.util import Schema, SchemaItemTypes, get_csv_fn, read_schema, write_csv
+from src.util import (
+    Schema,
+    SchemaItemTypes,
+    SimpleEbookManagerException,
+    get_csv_fn,
+    read_schema,
+    write_csv,
+)
+from src.util.schema import _SchemaItemBase
+
+if TYPE_CHECKING:
+    from src.all_metadata import AllMetadata
+    from src.book import Book, BookFile, SortDisplay
 
 logger = logging.getLogger(__name__)
 
 _DELIM = ";"
 _ORD_OFFSET = ord("A") - 1
+# sortdisplay CSV columns are key, sort and display
+_NUM_SORTDISPLAY_COLS = 3
 
 
 def _get_file_key(book_title_key: str, basename: str) -> str:
@@ -26,6 +40,17 @@ def _get_file_key(book_title_key: str, basename: str) -> str:
     return "|".join([book_title_key, basename])
 
 
+@lru_cache(maxsize=None)
+def _get_vlookup_suffix(
+    sheetname: str, num_all_rows: int, num_all_cols: int, colname: str
+) -> str:
+    """Get the end of a VLOOKUP/MATCH string, which doesn't depend on the key."""
+    endcolchr = chr(num_all_cols + _ORD_OFFSET)
+    table_range = f"{sheetname}!A2:{sheetname}!{endcolchr}{num_all_rows + 1}"
+    match = f'MATCH("{colname}",{sheetname}!A1:{sheetname}!{endcolchr}1,0)'
+    return f"{table_range},{match},FALSE)"
+
+
 def _get_vlookup(
     sheetname: str, key: str, num_all_rows: int, num_all_cols: int, colname: str
 ) -> str:
@@ -35,39 +60,31 @@ def _get_vlookup(
     except ValueError:
         key = f'"{key}"'
 
-    endcolchr = chr(num_all_cols + _ORD_OFFSET)
-    table_range = f"{sheetname}!A2:{sheetname}!{endcolchr}{num_all_rows + 1}"
-    match = f'MATCH("{colname}",{sheetname}!A1:{sheetname}!{chr(num_all_cols + _ORD_OFFSET)}1,0)'
-    return f"VLOOKUP({key},{table_range},{match},FALSE)"
+    suffix = _get_vlookup_suffix(sheetname, num_all_rows, num_all_cols, colname)
+    return f"VLOOKUP({key},{suffix}"
 
 
 def _get_csv_output_string(
-    fieldname: str, items: Sequence[SortDisplay], num_all_rows: int, colname: str
+    fieldname: str, items: Sequence["SortDisplay"], num_all_rows: int, colname: str
 ) -> str:
     """Get a CONCATENATE string."""
     if len(items) == 0:
         return ""
 
-    vlookups = [
-        _get_vlookup(
-            fieldname,
-            item.key,
-            num_all_rows,
-            len(("key", "_sort", "_display")),
-            colname,
+    if len(items) == 1:
+        return "=" + _get_vlookup(
+            fieldname, items[0].key, num_all_rows, _NUM_SORTDISPLAY_COLS, colname
         )
+
+    vlookups = [
+        _get_vlookup(fieldname, item.key, num_all_rows, _NUM_SORTDISPLAY_COLS, colname)
         for item in items
     ]
-
-    return (
-        f"={vlookups[0]}"
-        if len(vlookups) == 1
-        else "=CONCATENATE(" + f', "{_DELIM}", '.join(vlookups) + ")"
-    )
+    return "=CONCATENATE(" + f', "{_DELIM}", '.join(vlookups) + ")"
 
 
 def _get_files_str(
-    files: Sequence[BookFile],
+    files: Sequence["BookFile"],
     book_title_key: str,
     num_all_files: int,
     num_file_cols: int,
@@ -96,96 +113,116 @@ def _get_book_colnames(schema: Schema, split: bool) -> Sequence[str]:
     colnames.append("metadata_directory")
     for item in schema:
         if isinstance(item, SchemaItemTypes.SortDisplay | SchemaItemTypes.Title):
-            colnames.append(f"{item.name}_sort")
-            colnames.append(f"{item.name}_display")
+            colnames.extend((f"{item.name}_sort", f"{item.name}_display"))
         else:
             colnames.append(item.name)
     return tuple(colnames)
 
 
-def _get_book_rows(
-    am: AllMetadata,
-    schema: Schema,
-    colnames: Sequence[str],
-    num_file_cols: int,
-    split: Optional[bool],
-) -> Sequence[dict[str, str]]:
-    """Get all rows for the main book CSV."""
-    rows = []
-    for book in am.books:
-        colvals = [book.title.key] if split else []
-        colvals.append(str(book.metadata_dir))
-        for item in schema:
-            match item:
-                case SchemaItemTypes.Date():
-                    colvals.append(
-                        date_val.as_str(item.output_format)
-                        if (date_val := book.fields.dates[item.name]) is not None
-                        else ""
-                    )
+_BookColFunc = Callable[["Book"], Sequence[str]]
 
-                case SchemaItemTypes.File():
-                    if split:
-                        files_str = _get_files_str(
+
+def _get_book_col_func(
+    item: _SchemaItemBase, am: "AllMetadata", num_file_cols: int, split: bool
+) -> _BookColFunc:
+    """Get a function returning the main book CSV column values of item for a book.
+
+    Everything that doesn't depend on the book is worked out here, once per schema item.
+
+    """
+    fieldname = item.name
+    match item:
+        case SchemaItemTypes.Date():
+            output_format = item.output_format
+
+            def get_date_cols(book: "Book") -> Sequence[str]:
+                date_val = book.fields.dates[fieldname]
+                return (date_val.as_str(output_format) if date_val is not None else "",)
+
+            return get_date_cols
+
+        case SchemaItemTypes.File():
+            num_all_files = len(am.files)
+
+            def get_file_cols(book: "Book") -> Sequence[str]:
+                if split:
+                    return (
+                        _get_files_str(
                             book.files,
                             book.title.key,
-                            len(am.files),
+                            num_all_files,
                             num_file_cols,
-                            item.name,
-                        )
-                    else:
-                        files_str = _DELIM.join(
-                            [f"{f.basename}::{f.hash}" for f in book.files]
-                        )
-                    colvals.append(files_str)
-
-                case SchemaItemTypes.KeyValue():
-                    colvals.append(
-                        _DELIM.join(
-                            [
-                                f"{kv.key}:{kv.value}"
-                                for kv in book.fields.keyvalues[item.name]
-                            ]
-                        )
+                            fieldname,
+                        ),
                     )
+                return (_DELIM.join([f"{f.basename}::{f.hash}" for f in book.files]),)
 
-                case SchemaItemTypes.SortDisplay():
-                    sortdisplays = book.fields.sortdisplays[item.name]
-                    if split:
-                        colvals.append(
-                            _get_csv_output_string(
-                                item.name,
-                                sortdisplays,
-                                len(am.fields[item.name]),
-                                f"{item.name}_sort",
-                            )
-                        )
-                        colvals.append(
-                            _get_csv_output_string(
-                                item.name,
-                                sortdisplays,
-                                len(am.fields[item.name]),
-                                f"{item.name}_display",
-                            )
-                        )
-                    else:
-                        colvals.append(_DELIM.join([sd.sort for sd in sortdisplays]))
-                        colvals.append(_DELIM.join([sd.display for sd in sortdisplays]))
-
-                case SchemaItemTypes.String():
-                    colvals.append(
-                        string_val
-                        if (string_val := book.fields.strings[item.name]) is not None
-                        else ""
+            return get_file_cols
+
+        case SchemaItemTypes.KeyValue():
+
+            def get_keyvalue_cols(book: "Book") -> Sequence[str]:
+                keyvalues = book.fields.keyvalues[fieldname]
+                return (_DELIM.join([f"{kv.key}:{kv.value}" for kv in keyvalues]),)
+
+            return get_keyvalue_cols
+
+        case SchemaItemTypes.SortDisplay():
+            num_all_sds = len(am.fields[fieldname]) if split else 0
+            sort_colname = f"{fieldname}_sort"
+            display_colname = f"{fieldname}_display"
+
+            def get_sortdisplay_cols(book: "Book") -> Sequence[str]:
+                sortdisplays = book.fields.sortdisplays[fieldname]
+                if split:
+                    return (
+                        _get_csv_output_string(
+                            fieldname, sortdisplays, num_all_sds, sort_colname
+                        ),
+                        _get_csv_output_string(
+                            fieldname, sortdisplays, num_all_sds, display_colname
+                        ),
                     )
+                return (
+                    _DELIM.join(map(attrgetter("sort"), sortdisplays)),
+                    _DELIM.join(map(attrgetter("display"), sortdisplays)),
+                )
+
+            return get_sortdisplay_cols
+
+        case SchemaItemTypes.String():
+
+            def get_string_cols(book: "Book") -> Sequence[str]:
+                string_val = book.fields.strings[fieldname]
+                return (string_val if string_val is not None else "",)
+
+            return get_string_cols
 
-                case SchemaItemTypes.Title():
-                    colvals.append(book.title.sort)
-                    colvals.append(book.title.display)
+        case SchemaItemTypes.Title():
 
-        rows.append(dict(zip(colnames, colvals, strict=True)))
+            def get_title_cols(book: "Book") -> Sequence[str]:
+                return (book.title.sort, book.title.display)
+
+            return get_title_cols
+
+    raise SimpleEbookManagerException(f"invalid schema item: {item}")
+
+
+def _get_book_rows(
+    am: "AllMetadata",
+    schema: Schema,
+    num_file_cols: int,
+    split: bool,
+) -> Iterator[list[str]]:
+    """Get all rows for the main book CSV."""
+    col_funcs = [_get_book_col_func(item, am, num_file_cols, split) for item in schema]
+    for book in am.books:
+        metadata_dir_str = str(book.metadata_dir)
+        colvals = [book.title.key, metadata_dir_str] if split else [metadata_dir_str]
+        for col_func in col_funcs:
+            colvals.extend(col_func(book))
 
-    return rows
+        yield colvals
 
 
 def _get_file_colnames(schema: Schema) -> Sequence[str]:
@@ -204,41 +241,39 @@ def _get_file_colnames(schema: Schema) -> Sequence[str]:
 
 
 def _get_file_rows(
-    am: AllMetadata, colnames: Sequence[str], num_book_cols: int, books_sheetname: str
-) -> Sequence[dict[str, str]]:
-    """Get all rows for the file CSV."""
-    key_map = {book.title.sort: book.title.key for book in am.books}
-    rows = []
-    for file in am.files:
-        book_title_key = key_map[file.book_title_sort]
-        colvals = [
-            _get_file_key(book_title_key, file.basename),
-            "="
-            + _get_vlookup(
-                books_sheetname,
-                book_title_key,
-                len(am.books),
-                num_book_cols,
-                colnames[1],
-            ),
+    am: "AllMetadata", colnames: Sequence[str], num_book_cols: int, books_sheetname: str
+) -> Iterator[list[str]]:
+    """Get all rows for the file CSV.
+
+    am.books and the files of each book are sorted the same way as am.files, so walking the
+    books gives rows in am.files order.
+
+    """
+    num_books = len(am.books)
+    for book in am.books:
+        book_title_key = book.title.key
+        title_vlookups = [
             "="
             + _get_vlookup(
                 books_sheetname,
                 book_title_key,
-                len(am.books),
+                num_books,
                 num_book_cols,
-                colnames[2],
-            ),
-            file.basename,
-            file.hash,
-            str(file.fn),
-            str(file.metadata_dir),
-            file.input_dir_str,
-            _DELIM.join([str(dir_var) for dir_var in file.dir_vars]),
+                colname,
+            )
+            for colname in colnames[1:3]
         ]
-        rows.append(dict(zip(colnames, colvals, strict=True)))
-
-    return rows
+        for file in book.files:
+            yield [
+                _get_file_key(book_title_key, file.basename),
+                *title_vlookups,
+                file.basename,
+                file.hash,
+                str(file.fn),
+                str(file.metadata_dir),
+                file.input_dir_str,
+                _DELIM.join(map(str, file.dir_vars)),
+            ]
 
 
 def _log_writing(csv_fn: Path) -> None:
@@ -249,43 +284,41 @@ def _log_writing(csv_fn: Path) -> None:
         logger.info("Creating '%s'.", csv_fn)
 
 
-def _write_csvs(output_dir: Path, am: AllMetadata, schema: Schema, split: bool) -> None:
+def _write_csvs(
+    output_dir: Path, am: "AllMetadata", schema: Schema, split: bool
+) -> None:
     """Write one or more CSV files."""
     book_colnames = _get_book_colnames(schema, split)
     file_colnames = _get_file_colnames(schema)
 
     books_fn = get_csv_fn(output_dir)
-    book_rows = _get_book_rows(am, schema, book_colnames, len(file_colnames), split)
+    book_rows = _get_book_rows(am, schema, len(file_colnames), split)
     _log_writing(books_fn)
-    write_csv(books_fn, book_rows)
-    logger.info(
-        "Wrote %s book%s to file.", len(book_rows), "" if len(book_rows) == 1 else "s"
-    )
+    num_books = write_csv(books_fn, book_colnames, book_rows)
+    logger.info("Wrote %s book%s to file.", num_books, "" if num_books == 1 else "s")
 
     csv_files = [books_fn]
     if split:
         for item in schema:
-            rows = None
+            colnames: Optional[Sequence[str]] = None
+            rows: Iterable[Sequence[str]] = ()
             match item:
                 case SchemaItemTypes.File():
+                    colnames = file_colnames
                     rows = _get_file_rows(
                         am, file_colnames, len(book_colnames), books_fn.stem
                     )
                 case SchemaItemTypes.SortDisplay():
-                    rows = [
-                        {
-                            "key": sd.key,
-                            f"{item.name}_sort": sd.sort,
-                            f"{item.name}_display": sd.display,
-                        }
-                        for sd in am.fields[item.name]
-                    ]
-
-            if rows is not None:
+                    colnames = ("key", f"{item.name}_sort", f"{item.name}_display")
+                    rows = (
+                        (sd.key, sd.sort, sd.display) for sd in am.fields[item.name]
+                    )
+
+            if colnames is not None:
                 csv_fn = get_csv_fn(output_dir, item.name)
                 csv_files.append(csv_fn)
                 _log_writing(csv_fn)
-                write_csv(csv_fn, rows)
+                write_csv(csv_fn, colnames, rows)
 
     if len(csv_files) == 1:
         logger.info("Finished writing CSV file.")
@@ -295,6 +328,9 @@ def _write_csvs(output_dir: Path, am: AllMetadata, schema: Schema, split: bool)
 
 def _main(args: Namespace, _: Optional[list[str]] = None) -> None:
     """Main code for executing command."""
+    # pylint: disable-next=import-outside-toplevel
+    from src.all_metadata import AllMetadata, KeyType
+
     output_dir = args.output_dir if args.output_dir else args.library_dirs[0]
     schema = read_schema(fn=args.schema, dirs=args.library_dirs)
     am = AllMetadata.from_args(
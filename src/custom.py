@@ -9,13 +9,14 @@ import importlib.util
 import sys
 from argparse import Namespace
 from pathlib import Path
-from types import SimpleNamespace
+from types import ModuleType, SimpleNamespace
 from typing import Callable, Optional, Sequence, cast
 
-from src.all_metadata import get_all_book_dirs
 from src.command import Args, CmdNames, Command
 from src.util import (
     SimpleEbookManagerException,
+    get_json_bytes,
+    get_text_bytes,
     read_json,
     read_text,
     write_json,
@@ -23,6 +24,8 @@ from src.util import (
 )
 
 IOFuncs = SimpleNamespace(
+    get_json_bytes=get_json_bytes,
+    get_text_bytes=get_text_bytes,
     read_json=read_json,
     read_text=read_text,
     write_json=write_json,
@@ -31,14 +34,23 @@ IOFuncs = SimpleNamespace(
 
 _ProcessFuncType = Callable[[Sequence[Path], list[str], SimpleNamespace], None]
 
+# user modules by resolved module filename and modification time
+_user_modules: dict[tuple[Path, int], ModuleType] = {}
+
 
 def get_process_func(user_module: str) -> _ProcessFuncType:
-    """Import user_module.
+    """Import user_module, reusing the earlier import if the file hasn't changed.
 
     See https://docs.python.org/3/library/importlib.html#importing-a-source-file-directly.
 
     """
     module_fn = Path(user_module)
+    cache_key = (module_fn.resolve(), module_fn.stat().st_mtime_ns)
+    if (module := _user_modules.get(cache_key)) is not None:
+        # another user module with the same name might have replaced it since
+        sys.modules[module.__name__] = module
+        return cast(_ProcessFuncType, module.process)
+
     module_name = module_fn.stem
     spec = importlib.util.spec_from_file_location(module_name, module_fn)
     if (spec is None) or (spec.loader is None):
@@ -46,11 +58,15 @@ def get_process_func(user_module: str) -> _ProcessFuncType:
     module = importlib.util.module_from_spec(spec)
     sys.modules[module_name] = module
     spec.loader.exec_module(module)
+    _user_modules[cache_key] = module
     return cast(_ProcessFuncType, module.process)
 
 
 def main(known_args: Namespace, extra_args: Optional[list[str]] = None) -> None:
     """Main code for executing command."""
+    # pylint: disable-next=import-outside-toplevel
+    from src.all_metadata import get_all_book_dirs
+
     if extra_args is None:
         # extra_args is Optional because it shares a common signature
         raise SimpleEbookManagerException("extra_args should never be None")
@@ -8,171 +8,275 @@ Create a SQLite database file from books.
 import logging
 from argparse import Namespace
 from pathlib import Path
-from sqlite3 import Connection, connect
-from typing import DefaultDict, Optional
+from sqlite3 import Connection, Cursor, connect
+from typing import TYPE_CHECKING, Callable, Iterator, Optional, Sequence
 
-from src.all_metadata import AllMetadata, KeyType
-from src.book import Book
 from src.command import Args, CmdNames, Command
-from src.util import Schema, SchemaItemTypes, get_db_fn, read_schema, read_text
+from src.util import (
+    Schema,
+    SchemaItemTypes,
+    SimpleEbookManagerException,
+    get_db_fn,
+    read_schema,
+    read_text,
+)
+from src.util.schema import _SchemaItemBase
 
 from . import sql
 
+if TYPE_CHECKING:
+    from src.all_metadata import AllMetadata
+    from src.book import Book
+
 logger = logging.getLogger(__name__)
 
 _BATCH_SIZE = 1000
 
 
-def _create_tables(conn: Connection, schema: Schema, use_uuid_key: bool) -> None:
-    """Create all tables and views for the database."""
-    conn.execute(sql.get_create_table_book_sql(schema, use_uuid_key))
+def _get_create_tables_sql(schema: Schema, use_uuid_key: bool) -> str:
+    """Get a script to create all tables and views for the database."""
+    statements = [sql.get_create_table_book_sql(schema, use_uuid_key)]
 
     for item in schema:
         match item:
             case SchemaItemTypes.File():
-                conn.execute(
-                    sql.get_create_table_book_file_sql(item.name, use_uuid_key)
-                )
-                conn.execute(
-                    sql.get_create_view_book_file_sql(item.name, schema.title_fieldname)
+                statements.extend(
+                    (
+                        sql.get_create_table_book_file_sql(item.name, use_uuid_key),
+                        sql.get_create_view_book_file_sql(
+                            item.name, schema.title_fieldname
+                        ),
+                    )
                 )
 
             case SchemaItemTypes.KeyValue():
-                conn.execute(
-                    sql.get_create_table_keyvalue_sql(
-                        item.name, item.key_label, item.value_label, use_uuid_key
-                    )
-                )
-                conn.execute(
-                    sql.get_create_view_keyvalue_sql(
-                        item.name,
-                        item.key_label,
-                        item.value_label,
-                        schema.title_fieldname,
+                statements.extend(
+                    (
+                        sql.get_create_table_keyvalue_sql(
+                            item.name, item.key_label, item.value_label, use_uuid_key
+                        ),
+                        sql.get_create_view_keyvalue_sql(
+                            item.name,
+                            item.key_label,
+                            item.value_label,
+                            schema.title_fieldname,
+                        ),
                     )
                 )
 
             case SchemaItemTypes.SortDisplay():
-                conn.execute(
-                    sql.get_create_table_sortdisplay_sql(item.name, use_uuid_key)
-                )
-                conn.execute(
-                    sql.get_create_table_sortdisplay_join_sql(item.name, use_uuid_key)
-                )
-                conn.execute(
-                    sql.get_create_view_sortdisplay_sql(
-                        item.name, schema.title_fieldname
+                statements.extend(
+                    (
+                        sql.get_create_table_sortdisplay_sql(item.name, use_uuid_key),
+                        sql.get_create_table_sortdisplay_join_sql(
+                            item.name, use_uuid_key
+                        ),
+                        sql.get_create_view_sortdisplay_sql(
+                            item.name, schema.title_fieldname
+                        ),
                     )
                 )
 
-    conn.execute(sql.get_create_view_summary_sql(schema))
+    statements.append(sql.get_create_view_summary_sql(schema))
+    return "".join(f"{statement};\n" for statement in statements)
 
 
-def _insert_sortdisplays(conn: Connection, am: AllMetadata, schema: Schema) -> None:
+def _insert_sortdisplays(conn: Connection, am: "AllMetadata", schema: Schema) -> None:
     """Insert SortDisplays into database."""
     for item in schema:
         if isinstance(item, SchemaItemTypes.SortDisplay):
             conn.executemany(
                 sql.get_insert_sortdisplay_sql(item.name),
-                [
-                    {"pkey": sd.key, "sort": sd.sort, "display": sd.display}
-                    for sd in am.fields[item.name]
-                ],
+                ((sd.key, sd.sort, sd.display) for sd in am.fields[item.name]),
             )
             logger.info("Inserted data type '%s'.", item.name)
 
 
-_InsertValsDict = dict[str, Optional[str]]
+# insert values are in the column order of the matching src.db.sql insert statement
+_InsertVals = tuple[Optional[str], ...]
+
+
+_BookValsFunc = Callable[["Book"], Sequence[Optional[str]]]
+
+
+def _get_book_vals_func(item: _SchemaItemBase) -> Optional[_BookValsFunc]:
+    """Get a function returning the book table insert values of item for a book.
+
+    Return None if item has no columns in the book table.
+
+    """
+    fieldname = item.name
+    match item:
+        case SchemaItemTypes.Date():
+            output_format = item.output_format
+
+            def get_date_vals(book: "Book") -> Sequence[Optional[str]]:
+                date_val = book.fields.dates[fieldname]
+                return (
+                    date_val.as_str(output_format) if date_val is not None else None,
+                )
+
+            return get_date_vals
+
+        case SchemaItemTypes.String():
+
+            def get_string_vals(book: "Book") -> Sequence[Optional[str]]:
+                return (book.fields.strings[fieldname],)
+
+            return get_string_vals
+
+        case SchemaItemTypes.Title():
+
+            def get_title_vals(book: "Book") -> Sequence[Optional[str]]:
+                return (book.title.sort, book.title.display)
+
+            return get_title_vals
+
+    return None
 
 
 def _get_book_insert_vals(
-    book: Book, schema: Schema
-) -> tuple[_InsertValsDict, dict[str, list[_InsertValsDict]]]:
-    """Get insert values for a single book."""
-    book_inserts: _InsertValsDict = {
-        "pkey": book.title.key,
-        "metadata_directory": str(book.metadata_dir),
-    }
-    post_book_inserts: dict[str, list[_InsertValsDict]] = {}
+    book: "Book", book_vals_funcs: Sequence[_BookValsFunc]
+) -> _InsertVals:
+    """Get the book table insert values for a single book."""
+    book_inserts: list[Optional[str]] = [book.title.key, str(book.metadata_dir)]
+    for book_vals_func in book_vals_funcs:
+        book_inserts.extend(book_vals_func(book))
+    return tuple(book_inserts)
+
+
+_PostBookInsertFunc = Callable[["Book"], Iterator[_InsertVals]]
+
+
+def _get_book_file_vals(book: "Book") -> Iterator[_InsertVals]:
+    """Yield book file table insert values for a book."""
+    for file in book.files:
+        yield (
+            book.title.key,
+            file.basename,
+            file.hash,
+            str(file.fn),
+            str(file.metadata_dir),
+            file.input_dir_str,
+            ";".join(map(str, file.dir_vars)),
+        )
+
+
+def _get_keyvalue_vals_func(fieldname: str) -> _PostBookInsertFunc:
+    """Get a function yielding keyvalue table insert values for a book."""
+
+    def get_keyvalue_vals(book: "Book") -> Iterator[_InsertVals]:
+        for k_v in book.fields.keyvalues[fieldname]:
+            yield (book.title.key, k_v.key, k_v.value)
+
+    return get_keyvalue_vals
+
+
+def _get_sortdisplay_join_vals_func(fieldname: str) -> _PostBookInsertFunc:
+    """Get a function yielding sortdisplay join table insert values for a book."""
+
+    def get_sortdisplay_join_vals(book: "Book") -> Iterator[_InsertVals]:
+        for val in book.fields.sortdisplays[fieldname]:
+            yield (book.title.key, val.key)
+
+    return get_sortdisplay_join_vals
+
+
+def _get_post_book_inserts(schema: Schema) -> list[tuple[str, _PostBookInsertFunc]]:
+    """Get insert SQL and insert values function pairs for tables referencing books.
+
+    The SQL is worked out here once per schema item instead of for every book.
+
+    """
+    post_book_inserts: list[tuple[str, _PostBookInsertFunc]] = []
     for item in schema:
         match item:
-            case SchemaItemTypes.Date():
-                book_inserts[item.name] = (
-                    date_val.as_str(item.output_format)
-                    if (date_val := book.fields.dates[item.name]) is not None
-                    else None
-                )
-
             case SchemaItemTypes.File():
-                sql_ = sql.get_insert_book_file_sql(item.name)
-                post_book_inserts[sql_] = []
-                for file in book.files:
-                    post_book_inserts[sql_].append(
-                        {
-                            "book_pkey": book.title.key,
-                            "file_name": file.basename,
-                            "file_hash": file.hash,
-                            "file_full_path": str(file.fn),
-                            "metadata_directory": str(file.metadata_dir),
-                            "file_directory": file.input_dir_str,
-                            "dir_vars": ";".join(
-                                [str(dir_var) for dir_var in file.dir_vars]
-                            ),
-                        }
-                    )
+                post_book_inserts.append(
+                    (sql.get_insert_book_file_sql(item.name), _get_book_file_vals)
+                )
 
             case SchemaItemTypes.KeyValue():
-                sql_ = sql.get_insert_keyvalue_sql(
-                    item.name, item.key_label, item.value_label
-                )
-                post_book_inserts[sql_] = []
-                for k_v in book.fields.keyvalues[item.name]:
-                    post_book_inserts[sql_].append(
-                        {
-                            "book_pkey": book.title.key,
-                            item.key_label: k_v.key,
-                            item.value_label: k_v.value,
-                        }
+                post_book_inserts.append(
+                    (
+                        sql.get_insert_keyvalue_sql(
+                            item.name, item.key_label, item.value_label
+                        ),
+                        _get_keyvalue_vals_func(item.name),
                     )
+                )
 
             case SchemaItemTypes.SortDisplay():
-                sql_ = sql.get_insert_sortdisplay_join_sql(item.name)
-                post_book_inserts[sql_] = []
-                for val in book.fields.sortdisplays[item.name]:
-                    post_book_inserts[sql_].append(
-                        {"book_pkey": book.title.key, f"{item.name}_pkey": val.key}
+                post_book_inserts.append(
+                    (
+                        sql.get_insert_sortdisplay_join_sql(item.name),
+                        _get_sortdisplay_join_vals_func(item.name),
                     )
+                )
 
-            case SchemaItemTypes.String():
-                book_inserts[item.name] = book.fields.strings[item.name]
+    return post_book_inserts
 
-            case SchemaItemTypes.Title():
-                book_inserts[f"{item.name}_sort"] = book.title.sort
-                book_inserts[f"{item.name}_display"] = book.title.display
 
-    return book_inserts, post_book_inserts
+def _insert_books_batch(
+    cursor: Cursor,
+    books: Sequence["Book"],
+    book_sql: str,
+    book_vals_funcs: Sequence[_BookValsFunc],
+    post_book_inserts: Sequence[tuple[str, _PostBookInsertFunc]],
+) -> None:
+    """Insert a batch of books and the rows referencing them."""
+    cursor.executemany(
+        book_sql, (_get_book_insert_vals(book, book_vals_funcs) for book in books)
+    )
+    for sql_, get_vals in post_book_inserts:
+        cursor.executemany(sql_, (vals for book in books for vals in get_vals(book)))
 
 
-def _insert_books_batch(
-    conn: Connection, am: AllMetadata, schema: Schema, start: int, end: int
+def _load_db(
+    conn: Connection, am: "AllMetadata", schema: Schema, use_uuid_key: bool
 ) -> None:
-    """Get insert values for a batch of books."""
-    book_inserts = []
-    post_book_inserts = DefaultDict(list)
-    for book in am.books[start:end]:
-        b_i, post_b_i = _get_book_insert_vals(book, schema)
-        book_inserts.append(b_i)
-        for sql_, vals in post_b_i.items():
-            post_book_inserts[sql_].extend(vals)
+    """Create all tables and views and insert all data in one transaction.
+
+    conn should be in autocommit mode (isolation_level=None) so table creation is part of the
+    transaction, instead of sqlite3 only opening one before the first insert.
 
-    conn.executemany(sql.get_insert_book_sql(schema), book_inserts)
-    for sql_, vals in post_book_inserts.items():
-        conn.executemany(sql_, vals)
+    """
+    with conn:
+        # foreign keys are checked once after loading instead of on every insert.
+        # executescript commits an open transaction first, so begin in the script.
+        conn.executescript("BEGIN;\n" + _get_create_tables_sql(schema, use_uuid_key))
+        _insert_sortdisplays(conn, am, schema)
+
+        book_sql = sql.get_insert_book_sql(schema)
+        book_vals_funcs = [
+            func for item in schema if (func := _get_book_vals_func(item)) is not None
+        ]
+        post_book_inserts = _get_post_book_inserts(schema)
+        # Connection.executemany creates a new cursor on every call
+        cursor = conn.cursor()
+        for start in range(0, len(am.books), _BATCH_SIZE):
+            end = start + _BATCH_SIZE
+            _insert_books_batch(
+                cursor,
+                am.books[start:end],
+                book_sql,
+                book_vals_funcs,
+                post_book_inserts,
+            )
+            num_books = min(len(am.books), end)
+            logger.info(
+                "Inserted %s book%s into database.",
+                num_books,
+                "" if num_books == 1 else "s",
+            )
+
+        if conn.execute("PRAGMA foreign_key_check").fetchone() is not None:
+            raise SimpleEbookManagerException("foreign key check failed")
 
 
 def _write_db(
     db_fn: Path,
-    am: AllMetadata,
+    am: "AllMetadata",
     schema: Schema,
     use_uuid_key: bool,
     user_sql_fn: Optional[Path],
@@ -184,34 +288,30 @@ def _write_db(
 
     logger.info("Creating '%s'.", db_fn)
 
-    conn = connect(db_fn)
+    # build the database in memory, then copy the finished pages to db_fn in one pass
+    mem_conn = connect(":memory:", isolation_level=None)
     try:
-        with conn:
+        _load_db(mem_conn, am, schema, use_uuid_key)
+        conn = connect(db_fn)
+        try:
+            mem_conn.backup(conn)
             conn.execute("PRAGMA foreign_keys=ON")
-            _create_tables(conn, schema, use_uuid_key)
-            _insert_sortdisplays(conn, am, schema)
-
-            for start in range(0, len(am.books), _BATCH_SIZE):
-                end = start + _BATCH_SIZE
-                _insert_books_batch(conn, am, schema, start, end)
-                num_books = min(len(am.books), end)
-                logger.info(
-                    "Inserted %s book%s into database.",
-                    num_books,
-                    "" if num_books == 1 else "s",
-                )
-
-        if user_sql_fn is not None:
-            logger.info("Running user SQL file '%s'.", user_sql_fn)
-            conn.executescript(read_text(user_sql_fn).strip())
+            if user_sql_fn is not None:
+                logger.info("Running user SQL file '%s'.", user_sql_fn)
+                conn.executescript(read_text(user_sql_fn).strip())
+        finally:
+            conn.close()
     finally:
-        conn.close()
+        mem_conn.close()
 
     logger.info("Finished creating '%s'.", db_fn)
 
 
 def _main(args: Namespace, _: Optional[list[str]] = None) -> None:
     """Main code for executing command."""
+    # pylint: disable-next=import-outside-toplevel
+    from src.all_metadata import AllMetadata, KeyType
+
     o_dir = args.output_dir if args.output_dir else args.library_dirs[0]
     schema = read_schema(fn=args.schema, dirs=args.library_dirs)
     am = AllMetadata.from_args(
@@ -61,7 +61,7 @@ def get_insert_book_sql(schema: Schema) -> str:
         INSERT INTO book (
             {", ".join(fieldnames)}
         ) VALUES (
-            {", ".join([f":{fieldname}" for fieldname in fieldnames])}
+            {", ".join(["?"] * len(fieldnames))}
         )
         """
     )
@@ -93,8 +93,8 @@ def get_insert_book_file_sql(fieldname: str) -> str:
             book_pkey, file_name, file_hash, file_full_path,
             metadata_directory, file_directory, dir_vars
         ) VALUES (
-            :book_pkey, :file_name, :file_hash, :file_full_path,
-            :metadata_directory, :file_directory, :dir_vars
+            ?, ?, ?, ?,
+            ?, ?, ?
         )
         """
     )
@@ -150,7 +150,7 @@ def get_insert_keyvalue_sql(fieldname: str, key_label: str, value_label: str) ->
         INSERT INTO book_{fieldname} (
             book_pkey, {key_label}, {value_label}
         ) VALUES (
-            :book_pkey, :{key_label}, :{value_label}
+            ?, ?, ?
         )
         """
     )
@@ -201,7 +201,7 @@ def get_insert_sortdisplay_sql(fieldname: str) -> str:
         INSERT INTO {fieldname} (
             pkey, sort, display
         ) VALUES (
-            :pkey, :sort, :display
+            ?, ?, ?
         )
         """
     )
@@ -251,7 +251,7 @@ def get_insert_sortdisplay_join_sql(fieldname: str) -> str:
         INSERT INTO book_{fieldname} (
             book_pkey, {fieldname}_pkey
         ) VALUES (
-        :book_pkey, :{fieldname}_pkey
+            ?, ?
         )
         """
     )
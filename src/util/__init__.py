@@ -10,10 +10,12 @@ from .file import (
     cmp,
     get_csv_fn,
     get_db_fn,
+    get_json_bytes,
     get_metadata_fn,
     get_newline,
     get_schema_fn,
     get_string_fn,
+    get_text_bytes,
     read_json,
     read_metadata,
     read_text,
@@ -41,10 +43,12 @@ __all__ = [
     "cmp",
     "get_csv_fn",
     "get_db_fn",
+    "get_json_bytes",
     "get_metadata_fn",
     "get_newline",
     "get_schema_fn",
     "get_string_fn",
+    "get_text_bytes",
     "read_json",
     "read_metadata",
     "read_text",
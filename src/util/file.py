@@ -7,10 +7,9 @@ Code for working with files.
 """
 import csv
 import enum
-import filecmp
 import json
 from pathlib import Path
-from typing import Any, Optional, Sequence
+from typing import Any, Iterable, Optional, Sequence
 
 from .misc import SimpleEbookManagerExit
 
@@ -19,12 +18,15 @@ _UTF_8 = "utf-8"
 
 
 def cmp(fn1: Path, fn2: Path) -> bool:
-    """Wrap filecmp.cmp to always use shallow=False.
+    """Compare file contents, checking sizes first.
 
-    The default shallow=True can give inconsistently incorrect results.
+    This is used instead of filecmp.cmp, whose default shallow=True can give inconsistently
+    incorrect results and which caches the result of every comparison.
 
     """
-    return filecmp.cmp(fn1, fn2, shallow=False)
+    return (fn1.stat().st_size == fn2.stat().st_size) and (
+        fn1.read_bytes() == fn2.read_bytes()
+    )
 
 
 def get_csv_fn(dir_: Optional[Path], stem: str = "books") -> Path:
@@ -85,19 +87,27 @@ class _JSONDuplicateExit(SimpleEbookManagerExit):
 
 def _error_if_duplicate_obj_keys(pairs: Sequence[tuple[str, str]]) -> dict[str, str]:
     """json.dumps object_pairs_hook to error if duplicate keys are found."""
-    r_dict = {}
-    for k, v in pairs:
-        if k in r_dict:
-            raise _JSONDuplicateExit(k)
-        r_dict[k] = v
+    r_dict = dict(pairs)
+    if len(r_dict) != len(pairs):
+        keys_seen: set[str] = set()
+        for k, _ in pairs:
+            if k in keys_seen:
+                raise _JSONDuplicateExit(k)
+            keys_seen.add(k)
     return r_dict
 
 
 def read_json(fn: Path) -> JSONType:
-    """Read JSON from fn."""
+    """Read JSON from fn.
+
+    Newlines are only whitespace to the JSON parser, so the file is decoded directly instead
+    of going through read_text's newline translation.
+
+    """
     try:
         json_data: JSONType = json.loads(
-            read_text(fn), object_pairs_hook=_error_if_duplicate_obj_keys
+            fn.read_bytes().decode(_UTF_8),
+            object_pairs_hook=_error_if_duplicate_obj_keys,
         )
     except _JSONDuplicateExit as exc:
         raise SimpleEbookManagerExit(
@@ -120,12 +130,42 @@ def read_text(fn: Path) -> str:
     return fn.read_text(encoding=_UTF_8)
 
 
-def write_csv(fn: Path, rows: Sequence[dict[str, str]]) -> None:
-    """Write rows to CSV file fn."""
+def write_csv(fn: Path, colnames: Sequence[str], rows: Iterable[Sequence[str]]) -> int:
+    """Write colnames and rows to CSV file fn and return the number of rows written.
+
+    rows is only iterated once so it can be a generator.
+
+    """
+    num_rows = 0
     with fn.open(mode="w", encoding=_UTF_8, newline="") as file:
-        writer = csv.DictWriter(file, rows[0].keys())
-        writer.writeheader()
-        writer.writerows(rows)
+        writer = csv.writer(file)
+        writer.writerow(colnames)
+        for num_rows, row in enumerate(rows, start=1):
+            writer.writerow(row)
+    return num_rows
+
+
+def get_json_bytes(
+    data: Any,
+    *,
+    newline: Newline = Newline.POSIX,
+    custom_kw: Optional[dict[str, Any]] = None,
+) -> bytes:
+    """Get standardized JSON as bytes. custom_kw will overwrite default kwargs."""
+    json_kw: dict[str, Any] = {"ensure_ascii": False, "indent": 4, "sort_keys": True}
+    if custom_kw is not None:
+        json_kw.update(custom_kw)
+    return get_text_bytes(json.dumps(data, **json_kw), newline=newline)
+
+
+def get_text_bytes(text: str, *, newline: Newline = Newline.POSIX) -> bytes:
+    """Get standardized text as bytes.
+
+    Newlines are translated the same way as when writing a file opened with newline set, see
+    https://docs.python.org/3/library/functions.html#open.
+
+    """
+    return (text.rstrip("\n") + "\n").replace("\n", newline.value).encode(_UTF_8)
 
 
 def write_json(
@@ -136,10 +176,7 @@ def write_json(
     custom_kw: Optional[dict[str, Any]] = None,
 ) -> None:
     """Write standardized JSON. custom_kw will overwrite default kwargs."""
-    json_kw: dict[str, Any] = {"ensure_ascii": False, "indent": 4, "sort_keys": True}
-    if custom_kw is not None:
-        json_kw.update(custom_kw)
-    write_text(fn, json.dumps(data, **json_kw), newline=newline)
+    fn.write_bytes(get_json_bytes(data, newline=newline, custom_kw=custom_kw))
 
 
 def write_schema(fn: Path, data: JSONType) -> None:
@@ -148,10 +185,5 @@ def write_schema(fn: Path, data: JSONType) -> None:
 
 
 def write_text(fn: Path, text: str, *, newline: Newline = Newline.POSIX) -> None:
-    """Write standardized text to fn.
-
-    Newline reference: https://docs.python.org/3/library/functions.html#open
-
-    """
-    with fn.open(mode="w", encoding=_UTF_8, newline=newline.value) as file:
-        file.write(text.rstrip("\n") + "\n")
+    """Write standardized text to fn."""
+    fn.write_bytes(get_text_bytes(text, newline=newline))
@@ -7,10 +7,11 @@ Miscellaneous code.
 """
 import enum
 import hashlib
-import itertools
 import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from multiprocessing.pool import Pool
 from pathlib import Path
 from typing import TYPE_CHECKING, Sequence
 
@@ -49,6 +50,10 @@ class SimpleEbookManagerExit(SystemExit):
 
 #### Hashes
 
+_HASH_CHUNK_SIZE = 2**20
+# hashlib releases the GIL while hashing, so threads can overlap reads and hashing
+_HASH_NUM_THREADS = min(32, (os.cpu_count() or 1) * 2)
+
 
 class Algorithm(enum.Enum):
     """Represents the user-requested hashing algorithm."""
@@ -60,21 +65,38 @@ class Algorithm(enum.Enum):
 def _get_file_hash(input_fn: Path, algo: Algorithm) -> str:
     """Get the hash of input_fn with the specified algorithm."""
     algo_name = algo.name.lower()
-    hash_obj: "_Hash" = getattr(hashlib, algo_name)()
-    with input_fn.open(mode="rb") as file:
-        while data := file.read(2**16):
-            if not data:
-                break
-            hash_obj.update(data)
+    hash_obj: "_Hash"
+    with input_fn.open(mode="rb", buffering=0) as file:
+        if os.fstat(file.fileno()).st_size <= _HASH_CHUNK_SIZE:
+            # small files take one read, skip the chunked reading setup
+            hash_obj = hashlib.new(algo_name, file.read())
+        elif sys.version_info >= (3, 11):
+            hash_obj = hashlib.file_digest(file, algo_name)
+        else:
+            hash_obj = getattr(hashlib, algo_name)()
+            # read into one reused buffer instead of allocating bytes for every chunk
+            buf_view = memoryview(bytearray(_HASH_CHUNK_SIZE))
+            while num_bytes := file.readinto(buf_view):
+                hash_obj.update(buf_view[:num_bytes])
 
     return ":".join([algo_name, hash_obj.hexdigest()])
 
 
 def get_file_hashes(inputs: Sequence[Path], algo: Algorithm) -> dict[Path, str]:
-    """Get the hashes of inputs with the specified algorithm."""
-    with Pool() as pool:
-        hashes = pool.starmap(_get_file_hash, zip(inputs, itertools.repeat(algo)))
-    return dict(zip(inputs, hashes, strict=True))
+    """Get the hashes of inputs with the specified algorithm.
+
+    Files are submitted largest first so a large file near the end of inputs doesn't leave
+    one thread hashing alone after the others finish.
+
+    """
+    with ThreadPoolExecutor(_HASH_NUM_THREADS) as executor:
+        futures = {
+            input_fn: executor.submit(_get_file_hash, input_fn, algo)
+            for input_fn in sorted(
+                inputs, key=lambda input_fn: input_fn.stat().st_size, reverse=True
+            )
+        }
+        return {input_fn: futures[input_fn].result() for input_fn in inputs}
 
 
 #### Other
@@ -87,4 +109,4 @@ def configure_logging() -> None:
 
 def get_log_records(cm: "_LoggingWatcher") -> Sequence[str]:
     """Get log messages."""
-    return tuple(r.getMessage() for r in cm.records)
+    return [r.getMessage() for r in cm.records]
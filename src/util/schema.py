@@ -7,7 +7,9 @@ Code for schemas.
 """
 import inspect
 import logging
+import sys
 from dataclasses import dataclass
+from functools import cached_property
 from pathlib import Path
 from typing import Generator, Optional, Sequence, Type
 
@@ -107,7 +109,7 @@ class Schema:
     def __iter__(self) -> Generator[_SchemaItemBase, None, None]:
         yield from self._schema_items
 
-    @property
+    @cached_property
     def title_fieldname(self) -> str:
         """Get title item name from _schema_items."""
         for item in self:
@@ -120,41 +122,38 @@ class Schema:
         """Get Schema from args."""
         schema_items: list[_SchemaItemBase] = []
         for name, type_raw in schema_dict.items():
-            name = name.lower()
+            # names are used as dict keys for every book
+            name = sys.intern(name.lower())
             if name in _NAMES_RESERVED:
                 raise _ReservedNameExit(name)
 
             item_cls_kwargs = {"name": name}
 
-            try:
-                if isinstance(type_raw, str):
-                    item_cls = _SCHEMA_TYPE_MAPPING[type_raw.lower()]
-                else:
-                    item_cls = _SCHEMA_TYPE_MAPPING[type_raw.pop("type").lower()]
-                    item_cls_kwargs.update(type_raw)
-            except Exception:
-                raise _InvalidTypeExit(name) from None
+            if isinstance(type_raw, str):
+                type_str = type_raw
+            elif isinstance(type_raw, dict) and isinstance(type_raw.get("type"), str):
+                type_str = type_raw.pop("type")
+                item_cls_kwargs.update(type_raw)
+            else:
+                raise _InvalidTypeExit(name)
+
+            if (item_cls := _SCHEMA_TYPE_MAPPING.get(type_str.lower())) is None:
+                raise _InvalidTypeExit(name)
 
             schema_items.append(item_cls(**item_cls_kwargs))
 
+        # schema item types don't subclass each other, so group items by exact type
+        names_by_type: dict[Type[_SchemaItemBase], list[str]] = {}
+        for item in schema_items:
+            names_by_type.setdefault(type(item), []).append(item.name)
+
         for type_required in _TYPES_REQUIRED:
-            type_found = False
-            for item in schema_items:
-                if isinstance(item, type_required):
-                    type_found = True
-                    break
-            if not type_found:
+            if type_required not in names_by_type:
                 raise _MissingRequiredTypeExit(_get_type_name(type_required))
 
         for type_no_dup in _TYPES_NO_DUPLICATES:
-            items_of_type = [
-                item for item in schema_items if isinstance(item, type_no_dup)
-            ]
-            if len(items_of_type) > 1:
-                raise _InvalidDuplicatesExit(
-                    _get_type_name(type_no_dup),
-                    [item.name for item in items_of_type],
-                )
+            if len(names_of_type := names_by_type.get(type_no_dup, [])) > 1:
+                raise _InvalidDuplicatesExit(_get_type_name(type_no_dup), names_of_type)
 
         return cls(tuple(schema_items))
 
@@ -186,11 +185,16 @@ def _read_schema_from_fn(fn: Path) -> Schema:
 def _read_schema_from_dirs(dirs: Sequence[Path]) -> tuple[Sequence[Path], Schema]:
     """Read schema from dirs."""
     schemas = {}
+    # library dirs often have copies of the same schema file, only parse each one once
+    schemas_by_contents: dict[bytes, Schema] = {}
     for dir_ in dirs:
         fn = get_schema_fn(dir_)
         if not fn.is_file():
             continue
-        schemas[fn] = _read_schema_from_fn(fn)
+        contents = fn.read_bytes()
+        if contents not in schemas_by_contents:
+            schemas_by_contents[contents] = _read_schema_from_fn(fn)
+        schemas[fn] = schemas_by_contents[contents]
 
     if not schemas:
         raise SimpleEbookManagerExit(
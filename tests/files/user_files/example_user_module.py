@@ -7,11 +7,8 @@ Example user module to pass to custom command.
 The important thing is to have a `process` function with the same signature as below.
 
 """
-import filecmp
 import logging
-import shutil
 from pathlib import Path
-from tempfile import TemporaryDirectory
 from types import SimpleNamespace
 from typing import Sequence
 
@@ -24,14 +21,13 @@ FIELDNAME = "example_user_module_str_func_name"
 
 
 def _update_desc_file(
-    book_dir: Path, temp_dir: Path, str_func_name: str, funcs: SimpleNamespace
+    book_dir: Path, str_func_name: str, funcs: SimpleNamespace
 ) -> bool:
     """Update description file, return whether file was changed."""
     desc_fn = book_dir / DESC_BASENAME
     if not desc_fn.is_file():
         return False
 
-    temp_desc_fn = temp_dir / DESC_BASENAME
     str_func = getattr(str, str_func_name)
 
     desc_lines = funcs.read_text(desc_fn).splitlines()
@@ -42,27 +38,26 @@ def _update_desc_file(
     else:
         desc_text = "\n".join([str_func(line) for line in desc_lines])
 
-    funcs.write_text(temp_desc_fn, desc_text)
-
-    if book_modified := not filecmp.cmp(temp_desc_fn, desc_fn, shallow=False):
-        shutil.move(temp_desc_fn, desc_fn)
+    # compare the new contents in memory, only write the file if it changed
+    desc_bytes = funcs.get_text_bytes(desc_text)
+    if book_modified := desc_fn.read_bytes() != desc_bytes:
+        desc_fn.write_bytes(desc_bytes)
 
     return book_modified
 
 
 def _update_metadata_file(
-    book_dir: Path, temp_dir: Path, str_func_name: str, funcs: SimpleNamespace
+    book_dir: Path, str_func_name: str, funcs: SimpleNamespace
 ) -> bool:
     """Update metadata file, return whether file was changed."""
     metadata_fn = book_dir / METADATA_BASENAME
-    temp_metadata_fn = temp_dir / METADATA_BASENAME
 
     metadata = funcs.read_json(metadata_fn)
     metadata[FIELDNAME] = str_func_name
-    funcs.write_json(temp_metadata_fn, metadata)
 
-    if book_modified := not filecmp.cmp(temp_metadata_fn, metadata_fn, shallow=False):
-        shutil.move(temp_metadata_fn, metadata_fn)
+    metadata_bytes = funcs.get_json_bytes(metadata)
+    if book_modified := metadata_fn.read_bytes() != metadata_bytes:
+        metadata_fn.write_bytes(metadata_bytes)
 
     return book_modified
 
@@ -78,7 +73,8 @@ def process(
     * book_dirs: book dirs found in library dirs provided to custom command
     * extra_args: command-line args that custom command couldn't identify so has passed here
     * funcs: a collection of helper functions to read and write files: read_json, write_json,
-        read_text and write_text
+        read_text and write_text, plus get_json_bytes and get_text_bytes to get the bytes that
+        write_json and write_text would write
     * returns None
 
     This example either lower- or uppercases the description file (except for the title prefix if
@@ -107,14 +103,10 @@ def process(
     num_books_modified = 0
     for book_dir in book_dirs:
         logger.info("Processing '%s'.", str(book_dir))
-        with TemporaryDirectory() as temp_dir_str:
-            temp_dir = Path(temp_dir_str)
-            desc_modified = _update_desc_file(book_dir, temp_dir, str_func_name, funcs)
-            metadata_modified = _update_metadata_file(
-                book_dir, temp_dir, str_func_name, funcs
-            )
-            if desc_modified or metadata_modified:
-                num_books_modified += 1
+        desc_modified = _update_desc_file(book_dir, str_func_name, funcs)
+        metadata_modified = _update_metadata_file(book_dir, str_func_name, funcs)
+        if desc_modified or metadata_modified:
+            num_books_modified += 1
 
     logger.info(
         "Modified %s book%s.",
@@ -5,17 +5,18 @@ Licensed under the GNU Affero General Public License (AGPL) v3.
 Test src.all_metadata.
 
 """
-import shutil
-import uuid
+import copy
+import re
 from itertools import chain
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional
 
 from src.all_metadata import AllMetadata, AMFields, KeyType, get_all_book_dirs
 from src.book import Book, SortDisplay
 from src.util import (
     LOG_LEVEL,
     DirVar,
+    Schema,
     SimpleEbookManagerExit,
     get_log_records,
     get_metadata_fn,
@@ -24,12 +25,16 @@ from src.util import (
 )
 from src.util.file import read_metadata
 from tests.base import (
+    UTF_8,
     VALID_LIBRARY_DIR,
     VALID_SCHEMA_FN,
     SimpleEbookManagerTestCase,
     ValidBookDirs,
 )
 
+# str(uuid.uuid4()) format
+_UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
 
 class TestGetAllBookDirs(SimpleEbookManagerTestCase):
     """Test get_all_book_dirs."""
@@ -77,15 +82,18 @@ class TestGetAllBookDirs(SimpleEbookManagerTestCase):
 class TestAllMetadata(SimpleEbookManagerTestCase):
     """Test AllMetadata."""
 
-    def setUp(self) -> None:
-        self.dir_vars = (DirVar("name1", "."), DirVar("name2", "."))
-        self.schema = read_schema(fn=VALID_SCHEMA_FN)
+    dir_vars = (DirVar("name1", "."), DirVar("name2", "."))
+    schema: Schema
+    valid_am: AllMetadata
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # read the library once, tests that mutate valid_am copy it first
+        cls.schema = read_schema(fn=VALID_SCHEMA_FN)
         valid_books = tuple(
             sorted(
-                [
-                    Book.from_args(b_dir, self.dir_vars, self.schema)
-                    for b_dir in get_all_book_dirs([VALID_LIBRARY_DIR])
-                ]
+                Book.from_args(b_dir, cls.dir_vars, cls.schema)
+                for b_dir in get_all_book_dirs([VALID_LIBRARY_DIR])
             )
         )
         valid_fields: AMFields = {
@@ -100,11 +108,23 @@ class TestAllMetadata(SimpleEbookManagerTestCase):
             )
         }
         valid_files = tuple(chain.from_iterable(book.files for book in valid_books))
-        self.valid_am = AllMetadata(valid_books, valid_fields, valid_files)
-        super().setUp()
+        cls.valid_am = AllMetadata(valid_books, valid_fields, valid_files)
+        super().setUpClass()
+
+    @staticmethod
+    def _get_sds_index(
+        fields: AMFields,
+    ) -> dict[str, dict[tuple[str, str], SortDisplay]]:
+        """Index sortdisplays by fieldname and (sort, display)."""
+        return {
+            fieldname: {(sd.sort, sd.display): sd for sd in sds}
+            for fieldname, sds in fields.items()
+        }
 
     def test_int(self) -> None:
         """Test from_args with key_type INT."""
+        # this test mutates the books
+        valid_am = copy.deepcopy(self.valid_am)
         with self.assertLogs(level=LOG_LEVEL) as cm:
             am = AllMetadata.from_args(
                 [VALID_LIBRARY_DIR], self.dir_vars, self.schema, key_type=KeyType.INT
@@ -114,19 +134,16 @@ class TestAllMetadata(SimpleEbookManagerTestCase):
         )
 
         # Replace book sortdisplay fields and title with sortdisplays with keys
-        for i, book in enumerate(self.valid_am.books):
+        sds_index = self._get_sds_index(valid_am.fields)
+        for i, book in enumerate(valid_am.books):
             book.title = SortDisplay(book.title.sort, book.title.display, str(i + 1))
 
             for fieldname, book_sds in book.fields.sortdisplays.items():
-                sds_with_keys = []
-                for sd in book_sds:
-                    for valid_sd in self.valid_am.fields[fieldname]:
-                        if (valid_sd.sort, valid_sd.display) == (sd.sort, sd.display):
-                            sds_with_keys.append(valid_sd)
-                            break
-                book.fields.sortdisplays[fieldname] = tuple(sds_with_keys)
+                book.fields.sortdisplays[fieldname] = tuple(
+                    sds_index[fieldname][(sd.sort, sd.display)] for sd in book_sds
+                )
 
-        self.assertEqual(self.valid_am, am)
+        self.assertEqual(valid_am, am)
 
     def test_none(self) -> None:
         """Test from_args with key_type NONE."""
@@ -146,13 +163,13 @@ class TestAllMetadata(SimpleEbookManagerTestCase):
         )
 
     def _assert_valid_uuid(self, sd: SortDisplay) -> None:
-        try:
-            uuid.UUID(sd.key)
-        except ValueError:
+        if (sd.key is None) or (_UUID_RE.fullmatch(sd.key) is None):
             self.fail(f"bad UUID key: {sd}")
 
     def test_uuid(self) -> None:
         """Test from_args with key_type UUID."""
+        # this test mutates the books
+        valid_am = copy.deepcopy(self.valid_am)
         with self.assertLogs(level=LOG_LEVEL) as cm:
             am = AllMetadata.from_args(
                 [VALID_LIBRARY_DIR], self.dir_vars, self.schema, key_type=KeyType.UUID
@@ -162,7 +179,7 @@ class TestAllMetadata(SimpleEbookManagerTestCase):
         )
 
         # Replace am sortdisplay fields with sortdisplays with keys
-        for fieldname, valid_sds in self.valid_am.fields.items():
+        for fieldname, valid_sds in valid_am.fields.items():
             sds_with_keys = []
             am_sds = am.fields[fieldname]
             for valid_sd, am_sd in zip(valid_sds, am_sds, strict=True):
@@ -170,42 +187,42 @@ class TestAllMetadata(SimpleEbookManagerTestCase):
                 self.assertEqual(valid_sd.display, am_sd.display)
                 self._assert_valid_uuid(am_sd)
                 sds_with_keys.append(am_sd)
-            self.valid_am.fields[fieldname] = tuple(sds_with_keys)
+            valid_am.fields[fieldname] = tuple(sds_with_keys)
 
         # Replace book sortdisplay fields and title with sortdisplays with keys
-        for book, am_book in zip(self.valid_am.books, am.books, strict=True):
+        sds_index = self._get_sds_index(valid_am.fields)
+        for book, am_book in zip(valid_am.books, am.books, strict=True):
             self.assertEqual(book.title.sort, am_book.title.sort)
             self.assertEqual(book.title.display, am_book.title.display)
             self._assert_valid_uuid(am_book.title)
             book.title = am_book.title
 
             for fieldname, book_sds in book.fields.sortdisplays.items():
-                sds_with_keys = []
-                for sd in book_sds:
-                    for valid_sd in self.valid_am.fields[fieldname]:
-                        if (valid_sd.sort, valid_sd.display) == (sd.sort, sd.display):
-                            sds_with_keys.append(valid_sd)
-                            break
-                book.fields.sortdisplays[fieldname] = tuple(sds_with_keys)
+                book.fields.sortdisplays[fieldname] = tuple(
+                    sds_index[fieldname][(sd.sort, sd.display)] for sd in book_sds
+                )
+
+        self.assertEqual(valid_am, am)
 
-        self.assertEqual(self.valid_am, am)
+    @staticmethod
+    def _write_book_dir(b_dir: Path, metadata: dict[str, Any]) -> None:
+        """Create a book dir with only a metadata file, other book files aren't needed."""
+        b_dir.mkdir()
+        write_json(get_metadata_fn(b_dir), metadata)
 
     def _test_error_duplicate_title(
         self, orig_b_dir: Path, diff: Optional[str] = None
     ) -> None:
         """General method to error with duplicate title."""
         l_dir = self.get_t_dir()
-        b_dirs = [l_dir / "a", l_dir / "b"]
-        for b_dir in b_dirs:
-            shutil.copytree(orig_b_dir, b_dir)
-        metadata_fn = get_metadata_fn(b_dirs[1])
-        metadata = read_metadata(metadata_fn)
+        metadata = read_metadata(orig_b_dir)
+        self._write_book_dir(l_dir / "a", metadata)
 
         field = metadata[self.schema.title_fieldname]
         if diff is not None:
             same = "display" if diff == "sort" else "sort"
             field[diff] += "x"
-            write_json(metadata_fn, metadata)
+        self._write_book_dir(l_dir / "b", metadata)
 
         match field:
             case str():
@@ -244,24 +261,40 @@ class TestAllMetadata(SimpleEbookManagerTestCase):
         """Error with partial duplicate title with different sorts."""
         self._test_error_duplicate_title(ValidBookDirs.MINIMAL, "sort")
 
+    def test_error_duplicate_title_before_read_error(self) -> None:
+        """Error with duplicate title before a read error in a later book dir."""
+        l_dir = self.get_t_dir()
+        metadata = read_metadata(ValidBookDirs.COMPRESSED_FIELDS)
+        self._write_book_dir(l_dir / "a", metadata)
+        self._write_book_dir(l_dir / "b", metadata)
+        (l_dir / "c").mkdir()
+        get_metadata_fn(l_dir / "c").write_text("{", encoding=UTF_8)
+
+        with self.assertRaises(SimpleEbookManagerExit) as cm:
+            AllMetadata.from_args(
+                [l_dir], self.dir_vars, self.schema, key_type=KeyType.NONE
+            )
+        self.assertEqual(
+            (
+                f"ERROR: the title '{metadata[self.schema.title_fieldname]}' appears in "
+                "more than one book."
+            ),
+            str(cm.exception),
+        )
+
     def _test_error_partial_duplicate_sortdisplay(self, diff: str) -> None:
         """Error if there are partial duplicate sortdisplays between books."""
         fieldname = "authors"
         l_dir = self.get_t_dir()
-        for i, b_dir in enumerate([l_dir / "a", l_dir / "b"]):
-            shutil.copytree(ValidBookDirs.COMPLETE, b_dir)
-            metadata_fn = get_metadata_fn(b_dir)
-            metadata = read_metadata(metadata_fn)
-            if i == 1:
-                # avoid duplicate title error
-                metadata["book_title"] = "asdf"
-
-                field = metadata[fieldname]
-                if diff is not None:
-                    same = "display" if diff == "sort" else "sort"
-                    field[0][diff] += "x"
-                    write_json(metadata_fn, metadata)
-            write_json(metadata_fn, metadata)
+        metadata = read_metadata(ValidBookDirs.COMPLETE)
+        self._write_book_dir(l_dir / "a", metadata)
+
+        # avoid duplicate title error
+        metadata["book_title"] = "asdf"
+        field = metadata[fieldname]
+        same = "display" if diff == "sort" else "sort"
+        field[0][diff] += "x"
+        self._write_book_dir(l_dir / "b", metadata)
 
         with self.assertRaises(SimpleEbookManagerExit) as cm:
             AllMetadata.from_args(
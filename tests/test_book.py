@@ -81,6 +81,13 @@ class TestDate(SimpleEbookManagerTestCase):
         self.assertEqual("01-31-0100", bookdate.as_str("%m-%d-%Y"))
 
 
+    def test_aware_same_instant(self) -> None:
+        """Test aware datetimes for the same instant with different offsets."""
+        dt_fmt = "%Y-%m-%d %H:%M %z"
+        for dt_str in ["2020-01-01 10:00 +0100", "2020-01-01 09:00 +0000"]:
+            self.assertEqual(dt_str, BookDate.from_args(dt_str, dt_fmt).as_str(dt_fmt))
+
+
 class TestGetDate(SimpleEbookManagerTestCase):
     """Test _get_date."""
 
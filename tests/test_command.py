@@ -11,6 +11,7 @@ import itertools
 import shutil
 from argparse import ArgumentParser, Namespace
 from dataclasses import asdict
+from pathlib import Path
 from typing import Sequence
 
 from src.command import (
@@ -120,6 +121,12 @@ class TestLibraryDirsAction(SimpleEbookManagerTestCase):
         action(self.parser, self.args, [str(l_dirs[1]), str(l_dirs[2])], self.opt)
         self.assertSequenceEqual(l_dirs, getattr(self.args, self.dest))
 
+    def test_empty_str(self) -> None:
+        """Test that an empty string is the current directory."""
+        action = LibraryDirsAction([self.opt], self.dest)
+        action(self.parser, self.args, [""], self.opt)
+        self.assertSequenceEqual([Path(".")], getattr(self.args, self.dest))
+
     def test_error_value_none(self) -> None:
         """Error if something is wrong with input values (None)."""
         action = LibraryDirsAction([self.opt], self.dest)
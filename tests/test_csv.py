@@ -46,7 +46,7 @@ def _write_localized_valid_csv(orig_csv: Path, valid_csv: Path, new_path: Path)
                     new_path
                     / Path(row["file_full_path"]).relative_to(PLACEHOLDER_DIR_STR)
                 )
-    write_csv(valid_csv, rows)
+    write_csv(valid_csv, list(rows[0]), [list(row.values()) for row in rows])
 
 
 class TestCsv(CommandTestCase):
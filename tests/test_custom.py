@@ -5,16 +5,18 @@ Licensed under the GNU Affero General Public License (AGPL) v3.
 Test src.custom.
 
 """
+import os
 import shutil
+import sys
 from pathlib import Path
 from typing import Sequence
 from unittest.mock import MagicMock, patch
 
 from src.all_metadata import get_all_book_dirs
 from src.command import Args, Command
-from src.custom import IOFuncs, get_cmd
+from src.custom import IOFuncs, get_cmd, get_process_func
 from src.util import LOG_LEVEL, get_log_records, get_string_fn, read_metadata, read_text
-from tests.base import EXAMPLE_LIBRARY_DIR, USER_MODULE_FN
+from tests.base import EXAMPLE_LIBRARY_DIR, USER_MODULE_FN, SimpleEbookManagerTestCase
 from tests.test_command import CommandTestCase
 
 _FIELDNAME = "example_user_module_str_func_name"
@@ -122,3 +124,29 @@ class TestCommand(CommandTestCase):
             f"ERROR: usage requires '{Args.CASE_TO.opt} {{lower,upper}}'.",
             str(cm.exception),
         )
+
+
+class TestGetProcessFunc(SimpleEbookManagerTestCase):
+    """Test get_process_func."""
+
+    def test_cache(self) -> None:
+        """Test that the user module is only imported again if it changes."""
+        user_modules_patcher = patch.dict("src.custom._user_modules")
+        user_modules_patcher.start()
+        self.addCleanup(user_modules_patcher.stop)
+        self.addCleanup(sys.modules.pop, "my_code", None)
+
+        user_module_fn = self.get_t_dir() / "my_code.py"
+        shutil.copy(USER_MODULE_FN, user_module_fn)
+
+        process_func = get_process_func(str(user_module_fn))
+        self.assertIs(process_func, get_process_func(str(user_module_fn)))
+
+        # a cache hit puts the cached module back if something else replaced it
+        module = sys.modules.pop("my_code")
+        self.assertIs(process_func, get_process_func(str(user_module_fn)))
+        self.assertIs(module, sys.modules["my_code"])
+
+        mtime_ns = user_module_fn.stat().st_mtime_ns + 1
+        os.utime(user_module_fn, ns=(mtime_ns, mtime_ns))
+        self.assertIsNot(process_func, get_process_func(str(user_module_fn)))
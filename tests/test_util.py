@@ -21,11 +21,13 @@ from src.util import (
     get_csv_fn,
     get_db_fn,
     get_file_hashes,
+    get_json_bytes,
     get_log_records,
     get_metadata_fn,
     get_newline,
     get_schema_fn,
     get_string_fn,
+    get_text_bytes,
     read_json,
     read_metadata,
     read_schema,
@@ -45,6 +47,22 @@ from tests.base import (
 )
 
 
+class TestCmp(SimpleEbookManagerTestCase):
+    """Test cmp."""
+
+    def test_cmp(self) -> None:
+        """Test cmp with same and different contents and sizes."""
+        t_dir = self.get_t_dir()
+        fn1, fn2, fn3, fn4 = [t_dir / f"{i}.txt" for i in range(4)]
+        write_text(fn1, "abc")
+        write_text(fn2, "abc")
+        write_text(fn3, "abd")
+        write_text(fn4, "abcd")
+        self.assertTrue(cmp(fn1, fn2))
+        self.assertFalse(cmp(fn1, fn3))
+        self.assertFalse(cmp(fn1, fn4))
+
+
 class TestGetFilename(SimpleEbookManagerTestCase):
     """Test "get fn" functions."""
 
@@ -190,15 +208,16 @@ class TestSchema(SimpleEbookManagerTestCase):
     def test_read_fn_error_problem_processing_type(self) -> None:
         """Error if there is a problem processing the type."""
         schema_fn = get_schema_fn(self.get_t_dir())
-        write_schema(schema_fn, {"a": "asdf", "1": "file", "2": "title"})
+        for type_raw in ["asdf", {"type": "asdf"}, {"input_format": "%Y"}, 1]:
+            write_schema(schema_fn, {"a": type_raw, "1": "file", "2": "title"})
 
-        with self.assertRaises(SimpleEbookManagerExit) as cm:
-            read_schema(fn=schema_fn)
+            with self.assertRaises(SimpleEbookManagerExit) as cm:
+                read_schema(fn=schema_fn)
 
-        self.assertEqual(
-            f"ERROR: problem processing type for item name 'a' found in '{schema_fn}'.",
-            str(cm.exception),
-        )
+            self.assertEqual(
+                f"ERROR: problem processing type for item name 'a' found in '{schema_fn}'.",
+                str(cm.exception),
+            )
 
     def test_read_fn_error_invalid_duplicate_type(self) -> None:
         """Error if there are invalid duplicate types."""
@@ -365,6 +384,29 @@ class TestReadFunctions(SimpleEbookManagerTestCase):
         self.assertEqual(valid_text, read_text(temp_fn))
 
 
+class TestGetBytesFunctions(SimpleEbookManagerTestCase):
+    """Test "get bytes" functions."""
+
+    def test_get_json_bytes(self) -> None:
+        """Test get_json_bytes."""
+        self.assertEqual(
+            b'{\r\n    "a": "\xc3\xa9",\r\n    "b": 1\r\n}\r\n',
+            get_json_bytes({"b": 1, "a": "é"}, newline=Newline.WINDOWS),
+        )
+        self.assertEqual(
+            b'{"b": 1, "a": 2}\n',
+            get_json_bytes(
+                {"b": 1, "a": 2}, custom_kw={"indent": None, "sort_keys": False}
+            ),
+        )
+
+    def test_get_text_bytes(self) -> None:
+        """Test get_text_bytes."""
+        for i in range(3):
+            self.assertEqual(b"a\nb\n", get_text_bytes("a\nb" + "\n" * i))
+        self.assertEqual(b"a\r\nb\r\n", get_text_bytes("a\nb", newline=Newline.WINDOWS))
+
+
 class TestWriteFunctions(SimpleEbookManagerTestCase):
     """Test write functions."""
 
@@ -373,7 +415,8 @@ class TestWriteFunctions(SimpleEbookManagerTestCase):
         col1, col2 = "col1", "col2"
         t_dir = self.get_t_dir()
         test_fn = t_dir / "test_output.csv"
-        write_csv(test_fn, [{col1: "a", col2: "b"}, {col1: "c", col2: "d1,d2"}])
+        num_rows = write_csv(test_fn, (col1, col2), [("a", "b"), ("c", "d1,d2")])
+        self.assertEqual(2, num_rows)
 
         valid_fn = t_dir / "valid_output.csv"
         with valid_fn.open("w", encoding=UTF_8, newline="") as file: